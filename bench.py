@@ -0,0 +1,179 @@
+"""Per-stage detection benchmark.
+
+Runs the main loop's detection stages on synthetic or recorded frames and
+reports p50/p95/p99 latency per stage plus frames per second for each
+overlay size. Results are written to JSON for comparing engine changes.
+
+    python bench.py --scales 1 1.5 2 --frames 500 --output bench.json
+    python bench.py --replay recordings/session1 --output bench.json
+"""
+import argparse
+import json
+import platform
+import time
+from datetime import datetime
+import numpy as np
+from capture import MssFrameSource, ReplayFrameSource, SyntheticFrameSource
+from controller import PDController
+from detection import BLUE_COLOR, DARK_COLOR, WHITE_COLOR, TrackingCache, get_matcher, find_blue_bar, find_vertical_bounds, find_dark_sections, largest_section
+from synth import MinigameParams, MinigameScene
+
+STAGES = ('capture', 'blue_bar', 'dark_bounds', 'white_marker', 'dark_sections', 'pd')
+
+
+def summarize(samples):
+    """p50/p95/p99/mean/max in milliseconds for a list of durations in seconds"""
+    if not samples:
+        return {'count': 0}
+    ms = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'count': int(ms.size), 'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99),
+            'mean_ms': float(ms.mean()), 'max_ms': float(ms.max())}
+
+
+def run_stages(source, overlay_area, frames, kp=0.1, kd=0.5, tracker=None, tolerance=0):
+    """Time each main loop stage over up to frames frames from source.
+
+    With a TrackingCache as tracker the bar and dark-bound stages go through
+    it like the engine does, and its hit/miss counts are included. tolerance
+    is the per-channel color tolerance used for all three colors. The pd
+    stage runs the engine's PDController with gains kp/kd, fed each frame's
+    capture time.
+    """
+    blue = get_matcher(BLUE_COLOR, tolerance)
+    dark = get_matcher(DARK_COLOR, tolerance)
+    white = get_matcher(WHITE_COLOR, tolerance)
+    find_bar = tracker.find_blue_bar if tracker is not None else find_blue_bar
+    find_bounds = tracker.find_dark_bounds if tracker is not None else find_vertical_bounds
+    timings = {stage: [] for stage in STAGES}
+    controller = PDController(kp=kp, kd=kd)
+    processed = 0
+    tracked = 0
+    held = 0
+    clock = time.perf_counter
+    start = clock()
+    with source:
+        while processed < frames:
+            t0 = clock()
+            frame = source.grab(overlay_area)
+            t1 = clock()
+            if frame is None:
+                break
+            processed += 1
+            timings['capture'].append(t1 - t0)
+            img = frame.img
+
+            bar = find_bar(img, blue)
+            t2 = clock()
+            timings['blue_bar'].append(t2 - t1)
+            if bar is None:
+                continue
+
+            temp_img = img[:, bar[1]:bar[2] + 1]
+            top_row, bottom_row = find_bounds(temp_img, dark)
+            t3 = clock()
+            timings['dark_bounds'].append(t3 - t2)
+            if top_row is None:
+                continue
+
+            real_img = temp_img[top_row:bottom_row + 1]
+            white_top, white_bottom = find_vertical_bounds(real_img, white)
+            t4 = clock()
+            timings['white_marker'].append(t4 - t3)
+            if white_top is None:
+                continue
+
+            largest = largest_section(find_dark_sections(real_img, (white_bottom - white_top + 1) * 2, dark))
+            t5 = clock()
+            timings['dark_sections'].append(t5 - t4)
+            if largest is None:
+                continue
+
+            real_height = real_img.shape[0]
+            normalized_error = (int(largest['middle']) - int(white_top)) / real_height
+            hold = controller.decide(normalized_error, frame.timestamp)
+            timings['pd'].append(clock() - t5)
+            tracked += 1
+            held += bool(hold)
+    elapsed = clock() - start
+    result = {
+        'frames': processed,
+        'tracked_frames': tracked,
+        'hold_frames': held,
+        'elapsed_s': elapsed,
+        'fps': processed / elapsed if elapsed > 0 else 0.0,
+        'stages': {stage: summarize(samples) for stage, samples in timings.items()},
+    }
+    if tracker is not None:
+        result['cache'] = tracker.stats()
+    return result
+
+
+def synthetic_source(scale, frames, noise=0.0):
+    """Pre-rendered scene frames, so rendering cost stays out of the capture stage"""
+    params = MinigameParams(scale=scale, noise=noise)
+    width, height = params.overlay_size()
+    scene = MinigameScene(params)
+    rendered = [scene.frame(i)[0] for i in range(min(frames, 120))]
+    source = SyntheticFrameSource(lambda i, area: rendered[i % len(rendered)], count=frames)
+    return source, {'x': 0, 'y': 0, 'width': width, 'height': height}
+
+
+def print_report(name, result):
+    print(f"{name}: {result['frames']} frames, {result['tracked_frames']} tracked, {result['fps']:.0f} fps")
+    for stage in STAGES:
+        s = result['stages'][stage]
+        if s['count']:
+            print(f"  {stage:<14} p50 {s['p50_ms']:8.3f} ms  p95 {s['p95_ms']:8.3f} ms  p99 {s['p99_ms']:8.3f} ms")
+    for key, c in result.get('cache', {}).items():
+        print(f"  cache {key:<8} {c['hits']} hits / {c['misses']} misses ({c['hit_rate']:.0%})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the detection stages of the fishing loop')
+    parser.add_argument('--frames', type=int, default=500, help='frames per run')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 1.25, 1.5, 2.0],
+                        help='DPI scales of the default 172x495 overlay for synthetic runs')
+    parser.add_argument('--noise', type=float, default=0.0, help='gaussian noise on synthetic frames')
+    parser.add_argument('--replay', help='directory of .npy frames or .npz recording to benchmark instead')
+    parser.add_argument('--live', action='store_true', help='capture the screen with mss (uses --area)')
+    parser.add_argument('--area', type=int, nargs=4, metavar=('X', 'Y', 'W', 'H'), default=[100, 100, 172, 495])
+    parser.add_argument('--tolerance', type=int, default=0, help='per-channel color tolerance for detection')
+    parser.add_argument('--cache', action='store_true', help='look up the bar and dark bounds through a TrackingCache')
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    runs = {}
+    if args.replay or args.live:
+        x, y, w, h = args.area
+        area = {'x': x, 'y': y, 'width': w, 'height': h}
+        source = ReplayFrameSource(args.replay) if args.replay else MssFrameSource()
+        name = args.replay if args.replay else f'live {w}x{h}'
+        runs[name] = run_stages(source, area, args.frames, tracker=TrackingCache() if args.cache else None,
+                                tolerance=args.tolerance)
+        print_report(name, runs[name])
+    else:
+        for scale in args.scales:
+            source, area = synthetic_source(scale, args.frames, args.noise)
+            name = f"{area['width']}x{area['height']}"
+            result = run_stages(source, area, args.frames, tracker=TrackingCache() if args.cache else None,
+                                tolerance=args.tolerance)
+            result['scale'] = scale
+            runs[name] = result
+            print_report(name, result)
+
+    if args.output:
+        report = {
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'runs': runs,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
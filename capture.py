@@ -0,0 +1,162 @@
+import os
+import time
+import numpy as np
+
+
+class OverlayFrame:
+    """A single overlay capture; sub-regions are taken as views of the same buffer"""
+    def __init__(self, img, x, y, timestamp=None, capture_start=None):
+        self.img = img
+        self.x = x
+        self.y = y
+        # time.perf_counter() when the capture finished, and when it started
+        self.timestamp = time.perf_counter() if timestamp is None else timestamp
+        self.capture_start = self.timestamp if capture_start is None else capture_start
+
+    @property
+    def width(self):
+        return self.img.shape[1]
+
+    @property
+    def height(self):
+        return self.img.shape[0]
+
+    def region(self, area):
+        """Return a zero-copy view of a screen-coordinate area dict (x, y, width, height)"""
+        left = area['x'] - self.x
+        top = area['y'] - self.y
+        return self.img[top:top + area['height'], left:left + area['width']]
+
+def grab_overlay(sct, overlay_area):
+    """Grab the overlay area once and wrap it as an OverlayFrame.
+
+    The mss screenshot buffer is viewed in place with np.frombuffer, so the
+    pixels are not copied again. mss itself allocates that buffer on every
+    grab and has no way to capture into one we provide.
+    """
+    monitor = {'left': overlay_area['x'], 'top': overlay_area['y'],
+               'width': overlay_area['width'], 'height': overlay_area['height']}
+    started = time.perf_counter()
+    shot = sct.grab(monitor)
+    img = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+    return OverlayFrame(img, overlay_area['x'], overlay_area['y'], capture_start=started)
+
+
+class FrameSource:
+    """Where the main loop gets overlay frames from.
+
+    grab() returns an OverlayFrame for the requested overlay area, or None
+    once the source has no more frames (recordings), which stops the loop.
+    """
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def grab(self, overlay_area):
+        raise NotImplementedError
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class MssFrameSource(FrameSource):
+    """Live screen capture through mss, each screenshot wrapped without a copy"""
+    def __init__(self):
+        self.sct = None
+
+    def open(self):
+        import mss
+        self.sct = mss.mss()
+
+    def close(self):
+        if self.sct is not None:
+            self.sct.close()
+            self.sct = None
+
+    def grab(self, overlay_area):
+        return grab_overlay(self.sct, overlay_area)
+
+
+class ReplayFrameSource(FrameSource):
+    """Replays recorded overlay frames from a directory of .npy files or a single .npz"""
+    def __init__(self, path, loop=False):
+        self.path = path
+        self.loop = loop
+        self.frames = None
+        self.index = 0
+
+    def open(self):
+        if os.path.isdir(self.path):
+            names = sorted(n for n in os.listdir(self.path) if n.endswith('.npy'))
+            self.frames = [np.load(os.path.join(self.path, n)) for n in names]
+        else:
+            with np.load(self.path) as data:
+                self.frames = [data[k] for k in data.files]
+        self.index = 0
+
+    def close(self):
+        self.frames = None
+
+    def __len__(self):
+        return len(self.frames) if self.frames is not None else 0
+
+    def grab(self, overlay_area):
+        if not self.frames:
+            return None
+        if self.index >= len(self.frames):
+            if not self.loop:
+                return None
+            self.index = 0
+        started = time.perf_counter()
+        img = self.frames[self.index]
+        self.index += 1
+        return OverlayFrame(img, overlay_area['x'], overlay_area['y'], capture_start=started)
+
+
+class SyntheticFrameSource(FrameSource):
+    """Frames produced by a render(index, overlay_area) callable"""
+    def __init__(self, render, count=None):
+        self.render = render
+        self.count = count
+        self.index = 0
+
+    def open(self):
+        self.index = 0
+
+    def grab(self, overlay_area):
+        if self.count is not None and self.index >= self.count:
+            return None
+        started = time.perf_counter()
+        img = self.render(self.index, overlay_area)
+        self.index += 1
+        return OverlayFrame(img, overlay_area['x'], overlay_area['y'], capture_start=started)
+
+
+class RecordingFrameSource(FrameSource):
+    """Wraps another source and saves every frame it returns as numbered .npy files"""
+    def __init__(self, source, path):
+        self.source = source
+        self.path = path
+        self.index = 0
+
+    def open(self):
+        os.makedirs(self.path, exist_ok=True)
+        self.index = 0
+        self.source.open()
+
+    def close(self):
+        self.source.close()
+
+    def grab(self, overlay_area):
+        frame = self.source.grab(overlay_area)
+        if frame is not None:
+            np.save(os.path.join(self.path, f'frame_{self.index:06d}.npy'), frame.img)
+            self.index += 1
+        return frame
@@ -0,0 +1,109 @@
+import time
+import numpy as np
+from detection import get_matcher
+
+
+class ScreenConfirmer:
+    """Waits for a purchase step's UI by comparing a small screen patch to the last ready state.
+
+    snapshot() stores the patch around the step's point before the action the
+    step follows. The first time a step runs there is nothing to compare
+    against, so it waits the full timeout and stores the patch as that step's
+    template. Later runs poll the patch and return as soon as it differs from
+    the snapshot, has stopped changing and matches the template (mean
+    absolute difference per channel at most tolerance) for stable polls in a
+    row, or re-learn the template when the timeout passes without that (the
+    UI moved or changed). A step whose action leaves its point unchanged
+    never confirms and so always waits the full timeout, as does a step with
+    no snapshot.
+
+    source is a FrameSource opened by the caller, on the thread that calls
+    wait() (mss handles are thread-bound).
+    """
+    def __init__(self, source, radius=12, tolerance=10.0, poll=0.03, stable=2):
+        self.source = source
+        self.radius = radius
+        self.tolerance = tolerance
+        self.poll = poll
+        self.stable = stable
+        self.templates = {}
+        self.before = {}
+        self.confirmed = 0
+        self.timeouts = 0
+        self.saved = 0.0
+
+    def patch(self, point):
+        """BGR pixels of the square around a screen point, as int16 for differencing"""
+        r = self.radius
+        area = {'x': int(point[0]) - r, 'y': int(point[1]) - r, 'width': 2 * r + 1, 'height': 2 * r + 1}
+        return self.source.grab(area).img[:, :, :3].astype(np.int16)
+
+    def matches(self, patch, template):
+        return patch.shape == template.shape and float(np.abs(patch - template).mean()) <= self.tolerance
+
+    def pixel_matches(self, point, matcher):
+        """Whether the screen pixel at point matches a ColorMatcher"""
+        frame = self.source.grab({'x': int(point[0]), 'y': int(point[1]), 'width': 1, 'height': 1})
+        return bool(matcher.mask(frame.img)[0, 0])
+
+    def _poll(self, check, timeout, wait):
+        """Poll check() until it holds for stable polls in a row.
+
+        Returns True when it did within timeout seconds, False on timeout and
+        None when wait() aborted.
+        """
+        deadline = time.monotonic() + timeout
+        streak = 0
+        while time.monotonic() < deadline:
+            streak = streak + 1 if check() else 0
+            if streak >= self.stable:
+                self.confirmed += 1
+                self.saved += deadline - time.monotonic()
+                return True
+            if wait(min(self.poll, max(0.0, deadline - time.monotonic()))):
+                return None
+        self.timeouts += 1
+        return False
+
+    def snapshot(self, step, point):
+        """Store the patch around point as it was before the action step follows"""
+        self.before[step] = self.patch(point)
+
+    def wait(self, step, point, timeout, wait=None):
+        """Wait until the UI around point changed and settled for step, at most timeout seconds.
+
+        wait(seconds) is used for every pause and returns True to abort
+        early (e.g. a stop event's wait); returns True when confirmed visually.
+        """
+        wait = wait if wait is not None else lambda seconds: time.sleep(seconds) or False
+        before = self.before.pop(step, None)
+        template = self.templates.get(step)
+        if template is None or before is None:
+            if not wait(timeout):
+                self.templates[step] = self.patch(point)
+            return False
+        last = None
+
+        def settled():
+            nonlocal last
+            patch = self.patch(point)
+            steady = last is not None and self.matches(patch, last)
+            last = patch
+            return steady and not self.matches(patch, before) and self.matches(patch, template)
+        confirmed = self._poll(settled, timeout, wait)
+        if confirmed is False:
+            self.templates[step] = self.patch(point)
+        return bool(confirmed)
+
+    def wait_for_color(self, point, color, timeout, tolerance=0, wait=None):
+        """Wait until the pixel at point shows color (r, g, b) within tolerance, at most timeout seconds.
+
+        wait() works as in wait(); returns True when the color showed up.
+        """
+        wait = wait if wait is not None else lambda seconds: time.sleep(seconds) or False
+        matcher = get_matcher(tuple(color), int(tolerance))
+        return bool(self._poll(lambda: self.pixel_matches(point, matcher), timeout, wait))
+
+    def stats(self):
+        return {'templates': len(self.templates), 'confirmed': self.confirmed, 'timeouts': self.timeouts,
+                'seconds_saved': self.saved}
@@ -0,0 +1,68 @@
+import numpy as np
+
+# Loop period the kp/kd presets were tuned at (the old fixed 0.1s wait per frame)
+NOMINAL_DT = 0.1
+
+
+class PDController:
+    """PD controller on the normalized zone/marker error, driven by measured frame times.
+
+    The derivative is the error change per nominal_dt, computed from the real
+    interval between samples, so kp/kd mean the same at any frame rate as they
+    did at the nominal one. Optional extras:
+      derivative_filter - time constant (s) of a low-pass on the derivative, 0 = off
+      output_limit      - clamp the output to +/- this, None = off
+      hysteresis        - hold switches on above +hysteresis and off below
+                          -hysteresis, so noise around zero does not chatter
+    There is no integral term to wind up; instead the derivative state is
+    dropped after a gap longer than max_dt (lost detection, recast) so a stale
+    error never produces a derivative kick.
+
+    Works on scalars or, for the simulator, on numpy arrays of gains and errors.
+    """
+    def __init__(self, kp=0.1, kd=0.5, nominal_dt=NOMINAL_DT, derivative_filter=0.0,
+                 output_limit=None, hysteresis=0.0, max_dt=0.5):
+        self.kp = kp
+        self.kd = kd
+        self.nominal_dt = nominal_dt
+        self.derivative_filter = derivative_filter
+        self.output_limit = output_limit
+        self.hysteresis = hysteresis
+        self.max_dt = max_dt
+        self.reset()
+
+    def reset(self):
+        self.previous_error = None
+        self.previous_time = None
+        self.derivative = 0.0
+        self.output = 0.0
+        self.hold = False
+
+    def update(self, error, now):
+        """Feed the error measured at time now (seconds); returns the PD output"""
+        dt = now - self.previous_time if self.previous_time is not None else None
+        if dt is None or dt <= 0 or dt > self.max_dt:
+            derivative = 0.0 * error
+            self.derivative = derivative
+        else:
+            derivative = (error - self.previous_error) * (self.nominal_dt / dt)
+            if self.derivative_filter > 0:
+                alpha = dt / (self.derivative_filter + dt)
+                derivative = self.derivative + alpha * (derivative - self.derivative)
+            self.derivative = derivative
+        self.previous_error = error
+        self.previous_time = now
+        output = self.kp * error + self.kd * derivative
+        if self.output_limit is not None:
+            output = np.clip(output, -self.output_limit, self.output_limit)
+        self.output = output
+        return output
+
+    def decide(self, error, now):
+        """Feed an error and return whether to hold the button (see hysteresis)"""
+        output = self.update(error, now)
+        if self.hysteresis > 0:
+            self.hold = np.where(self.hold, output > -self.hysteresis, output > self.hysteresis)
+        else:
+            self.hold = output > 0
+        return self.hold
@@ -0,0 +1,215 @@
+import functools
+import numpy as np
+
+# Colors the minigame is drawn with, as (r, g, b)
+BLUE_COLOR = (85, 170, 255)
+DARK_COLOR = (25, 25, 25)
+WHITE_COLOR = (255, 255, 255)
+
+
+def packed_pixels(img):
+    """View a BGRA uint8 image as one uint32 per pixel (0xAARRGGBB on little-endian), without copying"""
+    if img.dtype != np.uint8 or img.shape[-1] != 4:
+        raise ValueError(f'Expected a BGRA uint8 image, got {img.dtype} {img.shape}')
+    if img.strides[-1] != 1 or img.strides[-2] != 4:
+        img = np.ascontiguousarray(img)
+    return img.view(np.uint32)[..., 0]
+
+
+class ColorMatcher:
+    """Matches pixels against an RGB color, exactly or within a per-channel tolerance.
+
+    Works on the frame viewed as packed uint32 pixels: an exact match is one
+    masked compare against a precomputed key, and a tolerant match is three
+    shift/subtract/compare range checks (values below the range wrap around
+    to large unsigned numbers), both cheaper than comparing the three
+    channel planes separately.
+    """
+    def __init__(self, color, tolerance=0):
+        r, g, b = color
+        self.color = tuple(color)
+        self.tolerance = max(0, int(tolerance))
+        self.key = np.uint32(b | g << 8 | r << 16)
+        # (shift, low, width) per channel, clamped to 0-255
+        self.ranges = []
+        for shift, value in ((0, b), (8, g), (16, r)):
+            low = max(0, value - self.tolerance)
+            high = min(255, value + self.tolerance)
+            self.ranges.append((shift, np.uint32(low), np.uint32(high - low)))
+
+    def mask(self, img):
+        """Return a (rows, cols) boolean mask of matching pixels in a BGRA image"""
+        packed = packed_pixels(img)
+        if self.tolerance == 0:
+            return (packed & np.uint32(0xFFFFFF)) == self.key
+        mask = None
+        for shift, low, width in self.ranges:
+            channel = (packed >> np.uint32(shift)) & np.uint32(0xFF) if shift else packed & np.uint32(0xFF)
+            channel -= low
+            if mask is None:
+                mask = channel <= width
+            else:
+                mask &= channel <= width
+        return mask
+
+
+@functools.lru_cache(maxsize=64)
+def get_matcher(color, tolerance=0):
+    """Shared ColorMatcher for an (r, g, b) tuple and tolerance"""
+    return ColorMatcher(color, tolerance)
+
+
+def color_mask(img, color):
+    """Return a (rows, cols) boolean mask of pixels in a BGRA image matching color.
+
+    color is an (r, g, b) tuple for an exact match or a ColorMatcher.
+    """
+    matcher = color if isinstance(color, ColorMatcher) else get_matcher(tuple(color))
+    return matcher.mask(img)
+
+
+def find_blue_bar(img, color=BLUE_COLOR):
+    """Find the first row holding the blue bar and its left/right columns.
+
+    Returns (row, left_col, right_col) in image coordinates, or None when the
+    bar is not visible. Matches a top-down, left-to-right scan for the first
+    pixel followed by a right-to-left scan of that row.
+    """
+    mask = color_mask(img, color)
+    rows = mask.any(axis=1)
+    if not rows.any():
+        return None
+    row = int(rows.argmax())
+    line = mask[row]
+    left = int(line.argmax())
+    right = int(line.size - 1 - line[::-1].argmax())
+    return row, left, right
+
+
+def find_vertical_bounds(img, color):
+    """Return (top_row, bottom_row) of the rows containing color, or (None, None)"""
+    rows = color_mask(img, color).any(axis=1)
+    if not rows.any():
+        return None, None
+    top = int(rows.argmax())
+    bottom = int(rows.size - 1 - rows[::-1].argmax())
+    return top, bottom
+
+
+# One record per dark section, rows relative to the scanned image
+SECTION_DTYPE = np.dtype([('start', np.int32), ('end', np.int32), ('middle', np.int32), ('size', np.int32)])
+
+
+def segment_rows(has_row, max_gap=0):
+    """Split a per-row boolean vector into sections, bridging gaps of up to max_gap rows.
+
+    Returns a SECTION_DTYPE array; start/end are the first and last flagged
+    rows of each section, so bridged gaps are inside a section but trailing
+    unflagged rows never are. An empty vector or one with no flagged rows
+    gives an empty array.
+    """
+    rows = np.flatnonzero(has_row)
+    if rows.size == 0:
+        return np.empty(0, dtype=SECTION_DTYPE)
+    breaks = np.flatnonzero(np.diff(rows) - 1 > max_gap)
+    sections = np.empty(breaks.size + 1, dtype=SECTION_DTYPE)
+    sections['start'] = rows[np.concatenate(([0], breaks + 1))]
+    sections['end'] = rows[np.concatenate((breaks, [rows.size - 1]))]
+    sections['middle'] = (sections['start'] + sections['end']) // 2
+    sections['size'] = sections['end'] - sections['start'] + 1
+    return sections
+
+
+def find_dark_sections(img, max_gap=None, color=DARK_COLOR):
+    """Group rows of img containing color into sections (see segment_rows).
+
+    max_gap is normally twice the white marker height. With no marker to size
+    it from, pass None: only directly adjacent rows are grouped.
+    """
+    return segment_rows(color_mask(img, color).any(axis=1), max_gap if max_gap is not None else 0)
+
+
+def largest_section(sections):
+    """The biggest section (the first one on ties), or None for an empty array"""
+    if sections.size == 0:
+        return None
+    return sections[int(sections['size'].argmax())]
+
+
+class TrackingCache:
+    """Remembers the last blue bar and dark bounds so steady frames skip the full scan.
+
+    Each lookup first re-checks the cached rows: the bar row must still start
+    and end at the cached columns with no bar pixels in the row above, and the
+    dark bounds must still be dark with no dark pixels just outside them. Only
+    when that check fails is the whole image scanned again, so a match that
+    appears further from the cached rows is only found then. Cached positions
+    are dropped when the image size changes (overlay moved or resized).
+    """
+    def __init__(self):
+        self.bar = None
+        self.bounds = None
+        self.bar_shape = None
+        self.bounds_shape = None
+        self.hits = {'bar': 0, 'bounds': 0}
+        self.misses = {'bar': 0, 'bounds': 0}
+
+    def reset(self):
+        self.bar = None
+        self.bounds = None
+
+    def _row_span(self, img, row, color):
+        line = color_mask(img[row:row + 1], color)[0]
+        if not line.any():
+            return None
+        return int(line.argmax()), int(line.size - 1 - line[::-1].argmax())
+
+    def _row_has(self, img, row, color):
+        return 0 <= row < img.shape[0] and bool(color_mask(img[row:row + 1], color).any())
+
+    def find_blue_bar(self, img, color=BLUE_COLOR):
+        """Cached bar when its row still spans the same columns and the row above has no bar pixels.
+
+        Otherwise the image is scanned with find_blue_bar and the result
+        cached. Bar pixels further up are not looked for, so until the cached
+        row stops matching this can differ from find_blue_bar on the same
+        frame.
+        """
+        if self.bar is not None and img.shape[:2] == self.bar_shape:
+            row, left, right = self.bar
+            if row < img.shape[0] and self._row_span(img, row, color) == (left, right) and not self._row_has(img, row - 1, color):
+                self.hits['bar'] += 1
+                return self.bar
+        self.misses['bar'] += 1
+        self.bar = find_blue_bar(img, color)
+        self.bar_shape = img.shape[:2]
+        return self.bar
+
+    def find_dark_bounds(self, img, color=DARK_COLOR):
+        """Cached bounds when both rows are still dark and the rows just outside them are not.
+
+        Otherwise the image is scanned with find_vertical_bounds and the result
+        cached. Dark rows further out are not looked for, so until a cached
+        row stops matching this can differ from find_vertical_bounds on the
+        same frame.
+        """
+        if self.bounds is not None and img.shape[:2] == self.bounds_shape:
+            top, bottom = self.bounds
+            if (self._row_has(img, top, color) and self._row_has(img, bottom, color)
+                    and not self._row_has(img, top - 1, color) and not self._row_has(img, bottom + 1, color)):
+                self.hits['bounds'] += 1
+                return self.bounds
+        self.misses['bounds'] += 1
+        top, bottom = find_vertical_bounds(img, color)
+        self.bounds = (top, bottom) if top is not None else None
+        self.bounds_shape = img.shape[:2]
+        return top, bottom
+
+    def stats(self):
+        """Hit/miss counts and hit rate per cached lookup"""
+        out = {}
+        for key in self.hits:
+            total = self.hits[key] + self.misses[key]
+            out[key] = {'hits': self.hits[key], 'misses': self.misses[key],
+                        'hit_rate': self.hits[key] / total if total else 0.0}
+        return out
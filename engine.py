@@ -0,0 +1,563 @@
+import threading
+import time
+import json
+import logging
+from capture import MssFrameSource
+from confirm import ScreenConfirmer
+from controller import PDController
+from inputs import default_backend
+from latency import LatencyRecorder
+from prediction import MotionPredictor
+from purchasing import PurchaseScheduler
+from pwm import DutyCycleDriver
+from sequence import SequenceRunner, compile_sequence, default_sequences
+from pacing import CancelToken, FrameScheduler
+from pipeline import PipelinedFrameSource, ControlStage
+from telemetry import TraceWriter
+from states import FishingStateMachine, CASTING, WAITING_FOR_BITE, REELING, LOST, PURCHASING, RECOVERING
+from detection import BLUE_COLOR, DARK_COLOR, WHITE_COLOR, TrackingCache, get_matcher, find_blue_bar, find_vertical_bounds, find_dark_sections, largest_section
+log = logging.getLogger(__name__)
+
+# Per-frame debug messages reach the console at most this often; the trace file gets every frame
+PER_FRAME = {'every': 0.5}
+
+# Rows above and below the last blue bar row scanned while waiting for a bite
+BITE_ROI_MARGIN = 24
+
+# Seconds a purchase-menu click keeps the button down
+CLICK_HOLD = 0.05
+
+
+class Settings:
+    """Fishing settings with the same defaults and preset keys as the GUI"""
+    def __init__(self):
+        self.auto_purchase_enabled = False
+        self.auto_purchase_amount = 10
+        self.loops_per_purchase = 10
+        self.point_coords = {1: None, 2: None, 3: None, 4: None}
+        self.kp = 0.1
+        self.kd = 0.5
+        self.derivative_filter = 0.0
+        self.hysteresis = 0.0
+        self.predictive_tracking = False
+        self.pwm_enabled = False
+        self.pwm_frequency = 30.0
+        self.pwm_full_scale = 0.1
+        self.blue_tolerance = 0
+        self.dark_tolerance = 0
+        self.white_tolerance = 0
+        self.scan_timeout = 15.0
+        self.wait_after_loss = 1.0
+        self.tracking_fps = 60.0
+        self.idle_fps = 10.0
+        self.pipelined = False
+        self.purchase_delay_after_key = 2.0
+        self.purchase_click_delay = 1.0
+        self.purchase_after_type_delay = 1.0
+        self.purchase_visual_confirm = True
+        self.adaptive_purchase = False
+        self.purchase_sequence, self.cancel_sequence = default_sequences()
+        self.overlay_area = {'x': 100, 'y': 100, 'width': 172, 'height': 495}
+
+    @classmethod
+    def from_preset(cls, preset_data):
+        """Build settings from a preset dict as written by HotkeyGUI.save_preset"""
+        settings = cls()
+        settings.auto_purchase_enabled = preset_data.get('auto_purchase_enabled', True)
+        settings.auto_purchase_amount = preset_data.get('auto_purchase_amount', 10)
+        settings.loops_per_purchase = preset_data.get('loops_per_purchase', 10)
+        settings.purchase_visual_confirm = preset_data.get('purchase_visual_confirm', True)
+        settings.adaptive_purchase = preset_data.get('adaptive_purchase', False)
+        settings.purchase_sequence = preset_data.get('purchase_sequence', settings.purchase_sequence)
+        settings.cancel_sequence = preset_data.get('cancel_sequence', settings.cancel_sequence)
+        settings.point_coords = {}
+        for k, v in preset_data.get('point_coords', {}).items():
+            try:
+                ik = int(k)
+            except Exception:
+                continue
+            settings.point_coords[ik] = tuple(v) if v is not None else None
+        settings.kp = preset_data.get('kp', 0.1)
+        settings.kd = preset_data.get('kd', 0.5)
+        settings.derivative_filter = preset_data.get('derivative_filter', 0.0)
+        settings.hysteresis = preset_data.get('hysteresis', 0.0)
+        settings.predictive_tracking = preset_data.get('predictive_tracking', False)
+        settings.pwm_enabled = preset_data.get('pwm_enabled', False)
+        settings.pwm_frequency = preset_data.get('pwm_frequency', 30.0)
+        settings.pwm_full_scale = preset_data.get('pwm_full_scale', 0.1)
+        settings.blue_tolerance = preset_data.get('blue_tolerance', 0)
+        settings.dark_tolerance = preset_data.get('dark_tolerance', 0)
+        settings.white_tolerance = preset_data.get('white_tolerance', 0)
+        settings.scan_timeout = preset_data.get('scan_timeout', 15.0)
+        settings.wait_after_loss = preset_data.get('wait_after_loss', 1.0)
+        settings.tracking_fps = preset_data.get('tracking_fps', 60.0)
+        settings.idle_fps = preset_data.get('idle_fps', 10.0)
+        settings.pipelined = preset_data.get('pipelined', False)
+        settings.overlay_area = preset_data.get('overlay_area', settings.overlay_area)
+        return settings
+
+    @classmethod
+    def load(cls, path):
+        """Load settings from a preset JSON file"""
+        with open(path, 'r') as f:
+            return cls.from_preset(json.load(f))
+
+
+class FishingEngine:
+    """Cast, detect and reel loop, independent of the GUI.
+
+    settings is any object exposing the Settings attributes (HotkeyGUI passes
+    itself so spinbox changes apply live). Frames come from frame_source,
+    which defaults to live mss capture, and input goes to input_backend (see
+    inputs.default_backend). Purchase steps are confirmed on screen through
+    probe_source, which defaults to its own mss capture when frame_source is
+    live too; without one the purchase delays are plain waits. With
+    trace_path, every tracked frame is appended to that JSON lines file (see
+    telemetry.FRAME_FIELDS).
+    """
+    def __init__(self, settings, frame_source=None, on_fish=None, trace_path=None, input_backend=None,
+                 probe_source=None):
+        self.settings = settings
+        self.frame_source = frame_source if frame_source is not None else MssFrameSource()
+        self.input = input_backend if input_backend is not None else default_backend()
+        if probe_source is None and frame_source is None:
+            probe_source = MssFrameSource()
+        self.confirmer = ScreenConfirmer(probe_source) if probe_source is not None else None
+        self.on_fish = on_fish
+        self.trace_path = trace_path
+        self.trace = None
+        self.active = False
+        self.thread = None
+        self.real_area = None
+        self.is_clicking = False
+        self.controller = PDController()
+        self.predictor = MotionPredictor()
+        self.purchase_counter = 0
+        self.scheduler = PurchaseScheduler()
+        self.fish_count = 0
+        self.cancel = CancelToken()
+        self.sequences = SequenceRunner(self.input, self.cancel.wait, self._wait_for_ui, click_hold=CLICK_HOLD,
+                                        before_input=self._snapshot_ui)
+        self.pacer = FrameScheduler(sleep=lambda seconds: self.cancel.wait(seconds, 'pace'))
+        self.latency = LatencyRecorder()
+        self.step_start = None
+        self.state = FishingStateMachine()
+        self.last_bar_row = None
+        self.fish_tracked = False
+        self.tracker = TrackingCache()
+        self.capture = None
+        self.control = None
+        self.driver = None
+
+    def start(self):
+        """Run the main loop on a background thread"""
+        self.active = True
+        self.cancel.reset()
+        self.fish_count = 0
+        self.latency.reset()
+        self.scheduler.reset()
+        self.thread = threading.Thread(target=self.main_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the main loop, cutting short any wait it is in, and release the mouse if it is held"""
+        self.active = False
+        self.cancel.cancel()
+        if self.control is not None:
+            self.control.drain()
+        if self.driver is not None:
+            self.driver.stop()
+        if self.is_clicking:
+            self.input.button('left', False)
+            self.is_clicking = False
+        # Reset PD controller state
+        self.controller.reset()
+        self.predictor.reset()
+
+    def _fish_caught(self):
+        self.fish_count += 1
+        if self.on_fish is not None:
+            self.on_fish()
+
+    def wait_stats(self):
+        """Per-stage wait counts and the seconds stop() cut short, from the run's CancelToken"""
+        return self.cancel.stats()
+
+    def overlay_changed(self):
+        """Forget cached bar positions after the overlay area was moved or resized"""
+        self.tracker = TrackingCache()
+        self.last_bar_row = None
+
+    def _snapshot_ui(self, step, action):
+        """Capture the UI near action.point before the input that wait step follows"""
+        if self.confirmer is None or action.color is not None or not self.settings.purchase_visual_confirm:
+            return
+        try:
+            self.confirmer.snapshot(step, action.point)
+        except Exception as e:
+            log.error('Screen snapshot failed for %s: %s', step, e)
+
+    def _wait_for_ui(self, step, action):
+        """Wait until the UI near action.point is ready for the next sequence step, at most action.seconds.
+
+        Returns True when the run was stopped during the wait.
+        """
+        stage = step.split(':')[0]
+        if self.confirmer is None or (action.color is None and not self.settings.purchase_visual_confirm):
+            return self.cancel.wait(action.seconds, stage)
+        started = time.monotonic()
+        wait = lambda seconds: self.cancel.wait(seconds, stage)
+        try:
+            if action.color is not None:
+                confirmed = self.confirmer.wait_for_color(action.point, action.color, action.seconds,
+                                                          action.tolerance, wait=wait)
+            else:
+                confirmed = self.confirmer.wait(step, action.point, action.seconds, wait=wait)
+            if confirmed:
+                log.debug('%s confirmed after %.2fs', step, time.monotonic() - started)
+        except Exception as e:
+            log.error('Screen check failed for %s: %s', step, e)
+            self.cancel.wait(action.seconds - (time.monotonic() - started), stage)
+        return self.cancel.cancelled
+
+    def _run_sequence(self, name, title, steps):
+        """Compile and run a purchase or cancel sequence from the settings; True when it completed"""
+        log.info('%s sequence start', title)
+        try:
+            actions = compile_sequence(steps, self.settings)
+        except ValueError as e:
+            log.warning('%s aborted: %s', title, e)
+            return False
+        if self.cancel.cancelled:
+            log.info('%s aborted: main loop stopped.', title)
+            return False
+        started = time.perf_counter()
+        if not self.sequences.run(name, actions):
+            return False
+        log.info('%s sequence complete in %.2fs', title, time.perf_counter() - started)
+        return True
+
+    def perform_auto_purchase_sequence(self):
+        return self._run_sequence('purchase', 'Auto-purchase', self.settings.purchase_sequence)
+
+    def perform_purchase_cancel(self):
+        return self._run_sequence('cancel', 'Purchase cancellation', self.settings.cancel_sequence)
+
+    def _purchase(self):
+        """Run the purchase flow and credit it to the scheduler when it completes"""
+        self.state.enter(PURCHASING)
+        started = time.monotonic()
+        if self.perform_auto_purchase_sequence():
+            self.scheduler.purchased(self.settings.auto_purchase_amount, time.monotonic() - started)
+
+    def check_and_purchase(self, event='catch'):
+        """Check if we need to auto-purchase after event (see purchasing.EVENTS) and run sequence if needed"""
+        if not self.settings.auto_purchase_enabled:
+            return
+        if self.settings.adaptive_purchase:
+            if self.scheduler.due(event):
+                try:
+                    self._purchase()
+                except Exception as e:
+                    log.error('Error during auto-purchase: %s', e)
+            return
+        if event != 'catch':
+            # Loop counting only counts finished reels
+            return
+        self.purchase_counter += 1
+        loops_needed = int(self.settings.loops_per_purchase) if self.settings.loops_per_purchase is not None else 1
+        log.info('Purchase counter: %d/%d', self.purchase_counter, loops_needed)
+        if self.purchase_counter >= max(1, loops_needed):
+            log.info('Triggering auto-purchase sequence')
+            try:
+                self._purchase()
+                self.purchase_counter = 0
+            except Exception as e:
+                log.error('Error during auto-purchase: %s', e)
+
+    def cast_line(self):
+        """Perform the casting action: hold click for 1 second then release"""
+        log.debug('Casting line')
+        self.is_clicking = True
+        self.input.button('left', True)
+        try:
+            if self.cancel.wait(1.0, 'cast'):
+                return
+        finally:
+            # Released even when stopped mid-cast
+            self.input.button('left', False)
+            self.is_clicking = False
+        log.info('Line cast')
+
+    def _colors(self):
+        """Matchers for the blue, dark and white colors at the configured tolerances"""
+        s = self.settings
+        return (get_matcher(BLUE_COLOR, int(s.blue_tolerance)),
+                get_matcher(DARK_COLOR, int(s.dark_tolerance)),
+                get_matcher(WHITE_COLOR, int(s.white_tolerance)))
+
+    def _pace(self):
+        # With a capture thread, waiting on the frame queue already paces the loop
+        started = time.perf_counter()
+        self.pacer.wait(0 if self.control is not None else self._rate())
+        self.latency.record('pace', time.perf_counter() - started)
+
+    def pipeline_stats(self):
+        """Queue depth and drop counts of the capture and control stages, or None when not pipelined"""
+        if self.control is None:
+            return None
+        return {'capture': self.capture.stats(), 'control': self.control.stats()}
+
+    def _rate(self):
+        """Target frame rate for the current state, the idle rate in states that do not grab frames.
+
+        Paces the loop itself, or the capture thread when pipelined.
+        """
+        policy = self.state.policy()
+        return getattr(self.settings, policy['fps']) if policy else self.settings.idle_fps
+
+    def _scan_region(self, frame):
+        """Part of frame to search for the blue bar under the current state's region-of-interest policy"""
+        if self.state.policy()['roi'] != 'bite' or self.last_bar_row is None:
+            return frame.img
+        top = max(0, self.last_bar_row - BITE_ROI_MARGIN)
+        return frame.img[top:self.last_bar_row + BITE_ROI_MARGIN + 1]
+
+    def _recast(self):
+        if self.cancel.cancelled:
+            return
+        self.state.enter(CASTING)
+        self.cast_line()
+        self.fish_tracked = False
+        self.state.enter(WAITING_FOR_BITE)
+
+    def main_loop(self):
+        """Main loop that runs when activated"""
+        log.info('Main loop started')
+        self.state = FishingStateMachine()
+        self.last_bar_row = None
+        self.tracker = TrackingCache()
+        self.controller.reset()
+        self.predictor.reset()
+        
+        source = self.frame_source
+        self.capture = None
+        self.control = None
+        if self.settings.pipelined:
+            source = self.capture = PipelinedFrameSource(source, rate=self._rate)
+            self.control = ControlStage(self._apply_hold, on_dispatched=self._dispatched)
+            self.control.start()
+        self.driver = None
+        if self.settings.pwm_enabled:
+            self.driver = DutyCycleDriver(self._apply_hold)
+            self._driver().start()
+        if self.trace_path:
+            self.trace = TraceWriter(self.trace_path)
+            self.trace.open()
+        
+        try:
+            if self.confirmer is not None:
+                # Opened here so the mss handle belongs to the thread running the purchase steps
+                self.confirmer.source.open()
+            with source:
+                if self.settings.auto_purchase_enabled:
+                    log.info('Running initial auto-purchase')
+                    self._purchase()
+                self._recast()
+                log.info('Entering main detection loop')
+                self.pacer.reset()
+            
+                while self.active:
+                    # One grab per iteration; every region below is a view of this frame
+                    frame = source.grab(self.settings.overlay_area)
+                    if frame is None:
+                        log.info('Frame source exhausted')
+                        break
+                
+                    self.step(frame)
+        finally:
+            if self.control is not None:
+                self.control.stop()
+            if self.driver is not None:
+                self.driver.stop()
+            # Whatever the control thread dispatched last, leave the button up
+            self._apply_hold(False)
+            if self.confirmer is not None:
+                self.confirmer.source.close()
+            if self.trace is not None:
+                self.trace.close()
+                self.trace = None
+            self.active = False
+            cancelled = {stage: s for stage, s in self.wait_stats().items() if s['cancelled']}
+            if cancelled:
+                log.info('Waits cut short by stop: %s', cancelled)
+            log.info('Loop pacing: %s', self.pacer.stats())
+            log.info('Time in state: %s', self.state.stats())
+            if self.control is not None:
+                log.info('Pipeline stats: %s', self.pipeline_stats())
+            if self.sequences.totals:
+                log.debug('Sequence timings: %s', self.sequences.stats())
+            if self.settings.auto_purchase_enabled:
+                log.info('Purchase stats: %s', self.scheduler.stats())
+            log.info('Main loop stopped')
+
+    def step(self, frame):
+        """Handle one captured frame according to the current state"""
+        self.step_start = self.latency.frame_started(frame)
+        blue_color = self._colors()[0]
+        if self.state.state == WAITING_FOR_BITE:
+            if find_blue_bar(self._scan_region(frame), blue_color) is None:
+                if self.state.elapsed() > self.settings.scan_timeout:
+                    log.info('Cast timeout after %ss, recasting', self.settings.scan_timeout)
+                    self.state.enter(RECOVERING)
+                    # The bar may have moved; search the whole overlay next time
+                    self.last_bar_row = None
+                    self.scheduler.record('timeout')
+                    self.perform_purchase_cancel()
+                    self.check_and_purchase('timeout')
+                    self._recast()
+                    if self.cancel.cancelled:
+                        # Stopped mid-recovery; the state has no frame rate to pace to
+                        return
+                self._pace()
+                return
+            self.state.enter(REELING)
+
+        bar = self.tracker.find_blue_bar(frame.img, blue_color)
+        if bar is None:
+            if self.fish_tracked:
+                log.info('Lost detection, waiting')
+                self._release_control()
+                self.state.enter(LOST)
+                self.scheduler.record('catch')
+                if self.cancel.wait(self.settings.wait_after_loss, 'loss'):
+                    return
+                self.check_and_purchase('catch')
+                self._recast()
+                if self.cancel.cancelled:
+                    return
+            else:
+                # The bar went away before a fish was ever tracked
+                self.scheduler.record('loss')
+                self._release_control()
+                self.check_and_purchase('loss')
+                if self.state.state == PURCHASING:
+                    # The purchase flow took the rod away from the water
+                    self._recast()
+                    if self.cancel.cancelled:
+                        return
+                else:
+                    self.state.enter(WAITING_FOR_BITE)
+            self._pace()
+            return
+
+        self.last_bar_row = bar[0]
+        self.reel(frame, bar)
+        self._pace()
+
+    def reel(self, frame, bar):
+        """Locate the fish zone and white marker in frame and drive the PD controller"""
+        _, dark_color, white_color = self._colors()
+        x = frame.x
+        y = frame.y
+        height = frame.height
+        point1_x = x + bar[1]
+        point2_x = x + bar[2]
+        temp_area_x = point1_x
+        temp_area_width = point2_x - point1_x + 1
+        temp_img = frame.region({'x': temp_area_x, 'y': y, 'width': temp_area_width, 'height': height})
+        top_row, bottom_row = self.tracker.find_dark_bounds(temp_img, dark_color)
+        if top_row is None:
+            return
+        top_y = y + top_row
+        bottom_y = y + bottom_row
+        self.real_area = {'x': temp_area_x, 'y': top_y, 'width': temp_area_width, 'height': bottom_y - top_y + 1}
+        real_y = self.real_area['y']
+        real_height = self.real_area['height']
+        real_img = frame.region(self.real_area)
+        white_top_row, white_bottom_row = find_vertical_bounds(real_img, white_color)
+        if white_top_row is None:
+            return
+        white_top_y = real_y + white_top_row
+        white_height = white_bottom_row - white_top_row + 1
+        max_gap = white_height * 2
+        largest = largest_section(find_dark_sections(real_img, max_gap, dark_color))
+        if largest is None:
+            return
+        detected = time.perf_counter()
+        # If this is the first time detecting this fish, increment counter
+        if not self.fish_tracked:
+            self._fish_caught()
+        self.fish_tracked = True
+        largest_middle = real_y + int(largest['middle'])
+        zone_y, marker_y = largest_middle, white_top_y
+        if self.settings.predictive_tracking:
+            # Aim at where both will be when the input lands, not where they were at capture
+            self.predictor.update(largest_middle, white_top_y, frame.timestamp)
+            zone_y, marker_y = self.predictor.predict(time.perf_counter() + self.latency.histograms['dispatch'].mean())
+        raw_error = zone_y - marker_y
+        normalized_error = raw_error / real_height if real_height > 0 else raw_error
+        # Derivative uses the real time between captures (see controller.PDController)
+        hold = bool(self._controller().decide(normalized_error, frame.timestamp))
+        pd_output = float(self.controller.output)
+        log.debug('marker y:%d zone y:%d error %dpx (%.3f normalized) PD output %.2f',
+                  white_top_y, largest_middle, raw_error, normalized_error, pd_output, extra=PER_FRAME)
+        decision = time.perf_counter()
+        self.latency.decided(self.step_start, detected, decision)
+
+        if self.driver is not None:
+            # The driver thread turns the output into a duty cycle; dispatch here means handed over
+            self._driver().set_output(pd_output)
+            self.latency.dispatched(frame.capture_start, decision)
+        elif self.control is not None:
+            self.control.submit(hold, frame.timestamp, (frame.capture_start, decision))
+        else:
+            self._apply_hold(hold)
+            self.latency.dispatched(frame.capture_start, decision)
+        if self.trace is not None:
+            self.trace.write(frame.timestamp, self.state.state, white_top_y, largest_middle, real_y, real_height,
+                             normalized_error, pd_output, hold)
+
+    def _controller(self):
+        """The PD controller with the current gains applied (GUI spinboxes change them live)"""
+        c = self.controller
+        c.kp = self.settings.kp
+        c.kd = self.settings.kd
+        c.derivative_filter = self.settings.derivative_filter
+        c.hysteresis = self.settings.hysteresis
+        return c
+
+    def _driver(self):
+        """The duty-cycle driver with the current carrier settings applied"""
+        self.driver.frequency = max(1.0, float(self.settings.pwm_frequency))
+        self.driver.full_scale = max(1e-6, float(self.settings.pwm_full_scale))
+        return self.driver
+
+    def _release_control(self):
+        """Drop pending hold/release decisions, stop duty cycling and release the button before taking over the mouse"""
+        if self.control is not None:
+            self.control.drain()
+        if self.driver is not None:
+            self.driver.pause()
+        # A fish lost mid-hold would otherwise leave the button down into the next cast or purchase
+        self._apply_hold(False)
+
+    def _dispatched(self, marks, now):
+        capture_start, decision = marks
+        self.latency.dispatched(capture_start, decision, now)
+
+    def _apply_hold(self, hold):
+        """Hold or release the left button, sending input only on a change"""
+        # Decide whether to hold or release based on PD output
+        # Positive error/output = middle is below, need to go up = hold click
+        # Negative error/output = middle is above, need to go down = release click
+        if hold:
+            # Need to accelerate up - hold left click
+            if not self.is_clicking:
+                self.input.button('left', True)
+                self.is_clicking = True
+        else:
+            # Need to accelerate down - release left click
+            if self.is_clicking:
+                self.input.button('left', False)
+                self.is_clicking = False
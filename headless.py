@@ -0,0 +1,132 @@
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+from capture import ReplayFrameSource
+from engine import FishingEngine, Settings
+from inputs import NullBackend
+from states import CASTING
+from telemetry import setup_logging, shutdown_logging
+
+log = logging.getLogger(__name__)
+
+PRESETS_DIR = 'presets'
+
+
+def resolve_preset(name):
+    """Path of a preset given as a file path or a name in presets/ (with or without .json)"""
+    if os.path.isfile(name):
+        return name
+    filename = name if name.endswith('.json') else f'{name}.json'
+    for directory in (PRESETS_DIR, os.path.join(os.path.dirname(os.path.abspath(__file__)), PRESETS_DIR)):
+        path = os.path.join(directory, filename)
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError(f'No preset {name!r} (looked for a file and for {filename} in {PRESETS_DIR}/)')
+
+
+def throughput(engine, elapsed):
+    """Fish/hour, fish, casts and timeouts of the current run"""
+    fish = engine.fish_count
+    counts = engine.scheduler.counts
+    return {
+        'elapsed_s': elapsed,
+        'fish': fish,
+        'fish_per_hour': fish / elapsed * 3600.0 if elapsed > 0 else 0.0,
+        'casts': engine.state.entries[CASTING],
+        'timeouts': counts['timeout'],
+        'losses': counts['loss'],
+        'purchases': engine.scheduler.purchases,
+    }
+
+
+def format_throughput(stats):
+    return (f"{stats['elapsed_s'] / 60.0:6.1f} min  {stats['fish']:4d} fish  {stats['fish_per_hour']:6.1f} fish/h  "
+            f"{stats['casts']:4d} casts  {stats['timeouts']:3d} timeouts  {stats['losses']:3d} losses  "
+            f"{stats['purchases']:3d} purchases")
+
+
+def install_signal_handlers():
+    """Event set by SIGINT, SIGTERM or SIGBREAK (Windows console close), for run(stop=...)"""
+    stop = threading.Event()
+
+    def on_signal(signum, frame):
+        log.info('Signal %s received, stopping', signum)
+        stop.set()
+    for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), on_signal)
+    return stop
+
+
+def run(preset_path, frame_source=None, input_backend=None, stats_every=60.0, duration=None, stop=None,
+        trace_path=None, on_started=None):
+    """Run the fishing loop from a preset file, without Tk, until it stops, duration passes or stop is set.
+
+    stop is a threading.Event (the CLI sets it from signal handlers); with
+    none given, Ctrl+C stops the run. Throughput is printed every
+    stats_every seconds and once more at the end; returns the final stats.
+    """
+    settings = Settings.load(preset_path)
+    engine = FishingEngine(settings, frame_source=frame_source, input_backend=input_backend, trace_path=trace_path)
+    stop = stop if stop is not None else threading.Event()
+    log.info('Running headless from %s', preset_path)
+    started = time.monotonic()
+    engine.start()
+    if on_started is not None:
+        on_started(engine)
+    next_stats = started + stats_every if stats_every > 0 else None
+    deadline = started + duration if duration else None
+    try:
+        while engine.thread.is_alive() and not stop.is_set():
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                log.info('Duration reached, stopping')
+                break
+            if next_stats is not None and now >= next_stats:
+                print(format_throughput(throughput(engine, now - started)), flush=True)
+                next_stats += stats_every
+            # Short waits so a signal or the deadline is acted on promptly
+            stop.wait(0.2)
+    except KeyboardInterrupt:
+        log.info('Interrupted, stopping')
+    finally:
+        engine.stop()
+        engine.thread.join(5.0)
+    stats = throughput(engine, time.monotonic() - started)
+    print('final ' + format_throughput(stats), flush=True)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the fishing loop from a preset without the GUI')
+    parser.add_argument('preset', help='preset file, or the name of one in presets/ (e.g. classic)')
+    parser.add_argument('--replay', help='directory of .npy frames or .npz recording to run against instead of the screen')
+    parser.add_argument('--loop', action='store_true', help='restart the --replay recording when it ends')
+    parser.add_argument('--no-input', action='store_true',
+                        help='send no mouse or keyboard input (always the case with --replay)')
+    parser.add_argument('--stats-every', type=float, default=60.0, help='seconds between throughput lines (0 = only at the end)')
+    parser.add_argument('--duration', type=float, default=None, help='stop after this many seconds')
+    parser.add_argument('--trace', help='append every tracked frame to this JSON lines file')
+    parser.add_argument('--log-level', default='INFO', help='DEBUG, INFO, WARNING, ...')
+    args = parser.parse_args(argv)
+
+    try:
+        preset_path = resolve_preset(args.preset)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    setup_logging(args.log_level.upper())
+    stop = install_signal_handlers()
+    frame_source = ReplayFrameSource(args.replay, loop=args.loop) if args.replay else None
+    input_backend = NullBackend() if args.replay or args.no_input else None
+    try:
+        run(preset_path, frame_source=frame_source, input_backend=input_backend, stats_every=args.stats_every,
+            duration=args.duration, stop=stop, trace_path=args.trace)
+    finally:
+        shutdown_logging()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+import ctypes
+import sys
+import threading
+import time
+try:
+    import keyboard
+    KEYBOARD_AVAILABLE = True
+except ImportError:
+    KEYBOARD_AVAILABLE = False
+
+# SendInput constants (winuser.h)
+INPUT_MOUSE = 0
+MOUSEEVENTF_MOVE = 0x0001
+MOUSEEVENTF_LEFTDOWN = 0x0002
+MOUSEEVENTF_LEFTUP = 0x0004
+MOUSEEVENTF_RIGHTDOWN = 0x0008
+MOUSEEVENTF_RIGHTUP = 0x0010
+MOUSEEVENTF_VIRTUALDESK = 0x4000
+MOUSEEVENTF_ABSOLUTE = 0x8000
+SM_XVIRTUALSCREEN = 76
+SM_YVIRTUALSCREEN = 77
+SM_CXVIRTUALSCREEN = 78
+SM_CYVIRTUALSCREEN = 79
+
+BUTTON_FLAGS = {
+    'left': (MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP),
+    'right': (MOUSEEVENTF_RIGHTDOWN, MOUSEEVENTF_RIGHTUP),
+}
+
+
+class InputBackend:
+    """Where the engine's mouse and keyboard actions go.
+
+    Subclasses implement move_to, button, press_key and type_text; click_at
+    is built from them unless a backend can do better.
+    """
+    def move_to(self, x, y):
+        raise NotImplementedError
+
+    def button(self, button, down):
+        """Press (down=True) or release a mouse button ('left' or 'right') where the cursor is"""
+        raise NotImplementedError
+
+    def click_at(self, x, y, button='left', hold=0.0):
+        """Move to (x, y) and click button, keeping it down for hold seconds"""
+        self.move_to(x, y)
+        self.button(button, True)
+        if hold > 0:
+            time.sleep(hold)
+        self.button(button, False)
+
+    def press_key(self, key):
+        raise NotImplementedError
+
+    def type_text(self, text):
+        raise NotImplementedError
+
+
+class NullBackend(InputBackend):
+    """Drops every action (headless runs without a recorder)"""
+    def move_to(self, x, y):
+        pass
+
+    def button(self, button, down):
+        pass
+
+    def click_at(self, x, y, button='left', hold=0.0):
+        pass
+
+    def press_key(self, key):
+        pass
+
+    def type_text(self, text):
+        pass
+
+
+class RecordingBackend(InputBackend):
+    """Records every action as (timestamp, action, args) instead of sending it.
+
+    Clicks still wait their hold time, so a purchase or reel flow run against
+    this backend takes as long as it would live and can be timed.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.events = []
+        self.lock = threading.Lock()
+
+    def _record(self, action, *args):
+        with self.lock:
+            self.events.append((self.clock(), action, args))
+
+    def move_to(self, x, y):
+        self._record('move', x, y)
+
+    def button(self, button, down):
+        self._record('down' if down else 'up', button)
+
+    def press_key(self, key):
+        self._record('key', key)
+
+    def type_text(self, text):
+        self._record('text', text)
+
+    def actions(self):
+        """Recorded actions without timestamps, e.g. [('move', (10, 20)), ('down', ('left',)), ...]"""
+        with self.lock:
+            return [(action, args) for _, action, args in self.events]
+
+    def clear(self):
+        with self.lock:
+            self.events.clear()
+
+
+class _MouseInput(ctypes.Structure):
+    _fields_ = [('dx', ctypes.c_long), ('dy', ctypes.c_long), ('mouseData', ctypes.c_ulong),
+                ('dwFlags', ctypes.c_ulong), ('time', ctypes.c_ulong), ('dwExtraInfo', ctypes.c_size_t)]
+
+
+class _KeybdInput(ctypes.Structure):
+    _fields_ = [('wVk', ctypes.c_ushort), ('wScan', ctypes.c_ushort), ('dwFlags', ctypes.c_ulong),
+                ('time', ctypes.c_ulong), ('dwExtraInfo', ctypes.c_size_t)]
+
+
+class _HardwareInput(ctypes.Structure):
+    _fields_ = [('uMsg', ctypes.c_ulong), ('wParamL', ctypes.c_ushort), ('wParamH', ctypes.c_ushort)]
+
+
+class _InputUnion(ctypes.Union):
+    _fields_ = [('mi', _MouseInput), ('ki', _KeybdInput), ('hi', _HardwareInput)]
+
+
+class _Input(ctypes.Structure):
+    _fields_ = [('type', ctypes.c_ulong), ('u', _InputUnion)]
+
+
+class SendInputBackend(InputBackend):
+    """Windows input through user32.SendInput.
+
+    A click sends the absolute move and the button down in one SendInput
+    call (and the release too when hold is 0), so nothing can slip in
+    between moving and pressing. Keys go through the keyboard package.
+    """
+    def __init__(self):
+        self.user32 = ctypes.windll.user32
+
+    def _mouse_event(self, flags, dx=0, dy=0):
+        event = _Input(type=INPUT_MOUSE)
+        event.u.mi = _MouseInput(dx, dy, 0, flags, 0, 0)
+        return event
+
+    def _absolute_move(self, x, y):
+        metrics = self.user32.GetSystemMetrics
+        left, top = metrics(SM_XVIRTUALSCREEN), metrics(SM_YVIRTUALSCREEN)
+        width, height = metrics(SM_CXVIRTUALSCREEN), metrics(SM_CYVIRTUALSCREEN)
+        dx = int((x - left) * 65535 / max(1, width - 1))
+        dy = int((y - top) * 65535 / max(1, height - 1))
+        return self._mouse_event(MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK, dx, dy)
+
+    def _send(self, *events):
+        batch = (_Input * len(events))(*events)
+        self.user32.SendInput(len(events), batch, ctypes.sizeof(_Input))
+
+    def move_to(self, x, y):
+        self._send(self._absolute_move(x, y))
+
+    def button(self, button, down):
+        down_flag, up_flag = BUTTON_FLAGS[button]
+        self._send(self._mouse_event(down_flag if down else up_flag))
+
+    def click_at(self, x, y, button='left', hold=0.0):
+        down_flag, up_flag = BUTTON_FLAGS[button]
+        if hold > 0:
+            self._send(self._absolute_move(x, y), self._mouse_event(down_flag))
+            time.sleep(hold)
+            self._send(self._mouse_event(up_flag))
+        else:
+            self._send(self._absolute_move(x, y), self._mouse_event(down_flag), self._mouse_event(up_flag))
+
+    def press_key(self, key):
+        if KEYBOARD_AVAILABLE:
+            keyboard.press_and_release(key)
+
+    def type_text(self, text):
+        if KEYBOARD_AVAILABLE:
+            keyboard.write(text)
+
+
+def default_backend():
+    """SendInput on Windows, otherwise a backend that drops all input"""
+    if sys.platform == 'win32':
+        return SendInputBackend()
+    return NullBackend()
@@ -0,0 +1,122 @@
+import bisect
+import json
+import time
+from datetime import datetime
+
+# Per-frame stages between a pixel being captured and the input call it leads to
+#   capture   - screen grab (capture start -> capture end)
+#   wait      - frame waiting to be processed (capture end -> step start): queueing or pacing
+#   detection - bar, zone and marker detection (step start -> detection end)
+#   decision  - PD controller (detection end -> decision)
+#   dispatch  - hold/release input call (decision -> input dispatched)
+#   total     - capture start -> input dispatched
+#   pace      - time the loop slept to hold the target frame rate, per iteration
+STAGES = ('capture', 'wait', 'detection', 'decision', 'dispatch', 'total', 'pace')
+
+# Bucket upper edges in seconds: 20 us to ~1.3 s, four buckets per doubling
+BUCKET_EDGES = tuple(20e-6 * 2 ** (i / 4) for i in range(65))
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram.
+
+    record() only increments counters, with no lock: each histogram has a
+    single writing thread (the engine loop, or the control thread for the
+    dispatch stages), and readers work on a copy of the counts, so a snapshot
+    may lag the writer by a sample but never blocks it.
+    """
+    def __init__(self, edges=BUCKET_EDGES):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.edges, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def mean(self):
+        """Mean latency in seconds, 0.0 before the first sample"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q, counts=None):
+        """Upper edge of the bucket holding the q-th percentile, in seconds (0.0 when empty)"""
+        counts = list(self.counts) if counts is None else counts
+        n = sum(counts)
+        if n == 0:
+            return 0.0
+        rank = q / 100.0 * n
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank and c:
+                return self.edges[i] if i < len(self.edges) else self.max
+        return self.max
+
+    def summary(self):
+        """count, mean, p50/p95/p99 and max in milliseconds"""
+        counts = list(self.counts)
+        count = self.count
+        if count == 0:
+            return {'count': 0}
+        return {
+            'count': count,
+            'mean_ms': self.total / count * 1000.0,
+            'p50_ms': self.percentile(50, counts) * 1000.0,
+            'p95_ms': self.percentile(95, counts) * 1000.0,
+            'p99_ms': self.percentile(99, counts) * 1000.0,
+            'max_ms': self.max * 1000.0,
+        }
+
+
+class LatencyRecorder:
+    """Frame-to-action latency per stage (see STAGES), from time.perf_counter() timestamps.
+
+    The engine calls frame_started() when it picks up a frame, decided() once
+    the PD output is known and dispatched() right after the input call, which
+    may happen on another thread.
+    """
+    def __init__(self):
+        self.clock = time.perf_counter
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+
+    def record(self, stage, seconds):
+        self.histograms[stage].record(seconds)
+
+    def frame_started(self, frame):
+        """Record capture and wait stages for frame; returns the step start time"""
+        now = self.clock()
+        self.histograms['capture'].record(frame.timestamp - frame.capture_start)
+        self.histograms['wait'].record(now - frame.timestamp)
+        return now
+
+    def decided(self, step_start, detected, decision):
+        self.histograms['detection'].record(detected - step_start)
+        self.histograms['decision'].record(decision - detected)
+
+    def dispatched(self, capture_start, decision, now=None):
+        now = self.clock() if now is None else now
+        self.histograms['dispatch'].record(now - decision)
+        self.histograms['total'].record(now - capture_start)
+
+    def summary(self):
+        return {stage: h.summary() for stage, h in self.histograms.items()}
+
+    def dump(self, path):
+        """Write per-stage summaries and raw bucket counts to a JSON file"""
+        report = {
+            'created': datetime.now().isoformat(),
+            'since': datetime.fromtimestamp(self.started).isoformat(),
+            'bucket_edges_ms': [edge * 1000.0 for edge in BUCKET_EDGES],
+            'stages': {stage: dict(h.summary(), buckets=list(h.counts)) for stage, h in self.histograms.items()},
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
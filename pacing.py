@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import deque
+
+
+class CancelToken:
+    """One stop signal that every wait of a run sleeps on.
+
+    wait() returns True as soon as cancel() is called, however long the wait
+    was meant to be. Waits are accounted per stage: how many ran, how many
+    were cut short, and the seconds spent in cut-short waits before the
+    cancel plus the seconds they skipped.
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.waits = {}
+
+    def cancel(self):
+        self.event.set()
+
+    def reset(self):
+        self.event.clear()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def wait(self, seconds, stage='other'):
+        """Sleep up to seconds; True when cancelled before or during the wait"""
+        started = time.monotonic()
+        cancelled = self.event.wait(max(0.0, seconds))
+        elapsed = time.monotonic() - started
+        with self.lock:
+            s = self.waits.setdefault(stage, {'waits': 0, 'cancelled': 0, 'cancelled_s': 0.0, 'skipped_s': 0.0})
+            s['waits'] += 1
+            if cancelled:
+                s['cancelled'] += 1
+                s['cancelled_s'] += elapsed
+                s['skipped_s'] += max(0.0, seconds - elapsed)
+        return cancelled
+
+    def stats(self):
+        with self.lock:
+            return {stage: dict(s) for stage, s in self.waits.items()}
+
+
+class FrameScheduler:
+    """Paces loop iterations to a target rate and measures the real loop period.
+
+    Call wait(rate) once per iteration: it sleeps whatever is left of the
+    1/rate period since the previous call and returns immediately when the
+    iteration already took longer (an overrun). A rate of 0 or less means no
+    pacing at all, which replay and benchmark runs use to go faster than
+    real time. sleep(seconds) does the sleeping, e.g. a CancelToken's wait.
+    """
+    def __init__(self, window=240, sleep=time.sleep):
+        self.sleep = sleep
+        self.periods = deque(maxlen=window)
+        self.last_tick = None
+        self.overruns = 0
+
+    def reset(self):
+        self.periods.clear()
+        self.last_tick = None
+        self.overruns = 0
+
+    def wait(self, rate):
+        now = time.perf_counter()
+        if self.last_tick is not None and rate > 0:
+            remaining = self.last_tick + 1.0 / rate - now
+            if remaining > 0:
+                self.sleep(remaining)
+                now = time.perf_counter()
+            else:
+                self.overruns += 1
+        if self.last_tick is not None:
+            self.periods.append(now - self.last_tick)
+        self.last_tick = now
+
+    def measured_rate(self):
+        """Average loop rate in Hz over the recent window, or 0.0 before two ticks"""
+        if not self.periods:
+            return 0.0
+        mean = sum(self.periods) / len(self.periods)
+        return 1.0 / mean if mean > 0 else 0.0
+
+    def stats(self):
+        periods = sorted(self.periods)
+        if not periods:
+            return {'samples': 0, 'overruns': self.overruns}
+        return {
+            'samples': len(periods),
+            'rate_hz': self.measured_rate(),
+            'period_p50_ms': periods[len(periods) // 2] * 1000.0,
+            'period_max_ms': periods[-1] * 1000.0,
+            'overruns': self.overruns,
+        }
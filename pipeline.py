@@ -0,0 +1,206 @@
+import logging
+import threading
+import time
+from collections import deque
+from capture import FrameSource
+from pacing import FrameScheduler
+
+log = logging.getLogger(__name__)
+
+
+class LatestQueue:
+    """Small bounded hand-off between threads where only the newest item matters.
+
+    put() never blocks: when the buffer is full the oldest item is dropped.
+    get_latest() returns the newest item and discards anything older as stale.
+    Both kinds of drop and the depth seen by each get are counted.
+    """
+    def __init__(self, maxlen=3):
+        self.items = deque(maxlen=maxlen)
+        self.cond = threading.Condition()
+        self.puts = 0
+        self.gets = 0
+        self.dropped_full = 0
+        self.dropped_stale = 0
+        self.max_depth = 0
+        self.depth_total = 0
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) == self.items.maxlen:
+                self.dropped_full += 1
+            self.items.append(item)
+            self.puts += 1
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.cond.notify()
+
+    def get_latest(self, timeout=None):
+        """Newest item, waiting up to timeout seconds for one; None on timeout"""
+        with self.cond:
+            if not self.items and not self.cond.wait_for(lambda: self.items, timeout):
+                return None
+            depth = len(self.items)
+            item = self.items.pop()
+            self.dropped_stale += len(self.items)
+            self.items.clear()
+            self.gets += 1
+            self.depth_total += depth
+            return item
+
+    def clear(self):
+        with self.cond:
+            self.items.clear()
+
+    def stats(self):
+        with self.cond:
+            return {
+                'depth': len(self.items),
+                'max_depth': self.max_depth,
+                'mean_depth_at_get': self.depth_total / self.gets if self.gets else 0.0,
+                'puts': self.puts,
+                'gets': self.gets,
+                'dropped_full': self.dropped_full,
+                'dropped_stale': self.dropped_stale,
+            }
+
+
+class PipelinedFrameSource(FrameSource):
+    """Runs another FrameSource on a capture thread; grab() returns the newest frame.
+
+    The capture thread opens the wrapped source itself (mss handles must stay
+    on the thread that created them), grabs the most recently requested area
+    at rate() frames per second (0 = as fast as possible) and pushes frames
+    into a LatestQueue, so a slow consumer never waits for a fresh capture and
+    never works on a stale one.
+    """
+    def __init__(self, source, rate=lambda: 0, maxlen=3):
+        self.source = source
+        self.rate = rate
+        self.queue = LatestQueue(maxlen)
+        self.area = None
+        self.thread = None
+        self.running = False
+        self.exhausted = False
+        self.error = None
+        self.captures = 0
+
+    def open(self):
+        self.running = True
+        self.exhausted = False
+        self.error = None
+        self.queue.clear()
+
+    def close(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        # Don't keep frames nobody will grab alive until the next open
+        self.queue.clear()
+
+    def _capture_loop(self):
+        pacer = FrameScheduler()
+        try:
+            with self.source:
+                while self.running:
+                    frame = self.source.grab(self.area)
+                    if frame is None:
+                        break
+                    self.captures += 1
+                    self.queue.put(frame)
+                    pacer.wait(self.rate())
+        except Exception as e:
+            self.error = e
+            log.error('Capture thread error: %s', e)
+        finally:
+            self.exhausted = True
+            # Wake a consumer blocked in grab()
+            self.queue.put(None)
+
+    def grab(self, overlay_area):
+        self.area = overlay_area
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self.thread.start()
+        while self.running:
+            frame = self.queue.get_latest(timeout=0.5)
+            if frame is not None:
+                return frame
+            if self.exhausted:
+                return None
+        return None
+
+    def stats(self):
+        stats = self.queue.stats()
+        stats['captures'] = self.captures
+        return stats
+
+
+class ControlStage:
+    """Applies the newest hold/release decision on its own thread.
+
+    The detection side submits (hold, frame_timestamp) and moves on; dispatch
+    (the actual input call) runs here. Decisions superseded before they were
+    dispatched are dropped. drain() discards pending decisions and waits for
+    an in-flight dispatch, so the caller can safely take over the mouse.
+    on_dispatched(marks, dispatched_at), if given, runs on this thread after
+    each dispatch with the marks passed to submit().
+    """
+    def __init__(self, dispatch, maxlen=2, on_dispatched=None):
+        self.dispatch = dispatch
+        self.on_dispatched = on_dispatched
+        self.queue = LatestQueue(maxlen)
+        self.lock = threading.Lock()
+        # Bumped by drain(); a decision taken before a drain is never dispatched after it
+        self.generation = 0
+        self.thread = None
+        self.running = False
+        self.dispatched = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def submit(self, hold, timestamp, marks=None):
+        self.queue.put((hold, timestamp, marks))
+
+    def drain(self):
+        with self.lock:
+            self.queue.clear()
+            self.generation += 1
+
+    def _run(self):
+        while self.running:
+            generation = self.generation
+            item = self.queue.get_latest(timeout=0.1)
+            if item is None:
+                continue
+            hold, timestamp, marks = item
+            with self.lock:
+                if self.generation != generation:
+                    # drain() ran while this decision was being taken
+                    continue
+                self.dispatch(hold)
+            now = time.perf_counter()
+            if self.on_dispatched is not None:
+                self.on_dispatched(marks, now)
+            latency = now - timestamp
+            self.dispatched += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def stats(self):
+        stats = self.queue.stats()
+        stats['dispatched'] = self.dispatched
+        stats['frame_to_dispatch_mean_ms'] = self.latency_total / self.dispatched * 1000.0 if self.dispatched else 0.0
+        stats['frame_to_dispatch_max_ms'] = self.latency_max * 1000.0
+        return stats
@@ -0,0 +1,90 @@
+import numpy as np
+
+
+class AlphaBetaFilter:
+    """Constant-velocity alpha-beta filter for one position measured at irregular times.
+
+    alpha weights the measurement against the predicted position, beta
+    updates the velocity from the same residual; lower values smooth more
+    and react more slowly. A gap longer than max_gap seconds restarts the
+    filter from the next measurement.
+    """
+    def __init__(self, alpha=0.5, beta=0.1, max_gap=0.5):
+        self.alpha = alpha
+        self.beta = beta
+        self.max_gap = max_gap
+        self.reset()
+
+    def reset(self):
+        self.position = None
+        self.velocity = 0.0
+        self.time = None
+
+    def update(self, measurement, now):
+        """Fold in a measurement taken at time now (seconds); returns the filtered position"""
+        dt = now - self.time if self.time is not None else None
+        if self.position is None or dt is None or dt <= 0 or dt > self.max_gap:
+            # + 0.0 copies arrays (the simulator filters many positions at once) and floats ints
+            self.position = measurement + 0.0
+            self.velocity = 0.0
+        else:
+            predicted = self.position + self.velocity * dt
+            residual = measurement - predicted
+            self.position = predicted + self.alpha * residual
+            self.velocity += self.beta / dt * residual
+        self.time = now
+        return self.position
+
+    def predict(self, when):
+        """Position extrapolated to time when, or None before the first measurement"""
+        if self.position is None:
+            return None
+        return self.position + self.velocity * (when - self.time)
+
+
+class MotionPredictor:
+    """Smooths the fish zone middle and white marker rows and predicts both ahead in time.
+
+    The engine feeds the rows detected in each frame with the frame's capture
+    time and asks for the positions at the time its input will be dispatched,
+    so capture and detection latency no longer leave the controller behind a
+    moving zone.
+    """
+    def __init__(self, alpha=0.5, beta=0.1, max_gap=0.5):
+        self.zone = AlphaBetaFilter(alpha, beta, max_gap)
+        self.marker = AlphaBetaFilter(alpha, beta, max_gap)
+
+    def reset(self):
+        self.zone.reset()
+        self.marker.reset()
+
+    def update(self, zone, marker, now):
+        self.zone.update(zone, now)
+        self.marker.update(marker, now)
+
+    def predict(self, when):
+        """(zone, marker) rows at time when"""
+        return self.zone.predict(when), self.marker.predict(when)
+
+
+def prediction_error(times, positions, lead, alpha=0.5, beta=0.1):
+    """RMS error predicting positions lead seconds ahead, with the filter and by holding the last sample.
+
+    Returns (filter_rms, hold_rms) over the samples whose future position is
+    known (linearly interpolated between samples), for checking the filter on
+    recorded trajectories.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.float64)
+    f = AlphaBetaFilter(alpha, beta, max_gap=np.inf)
+    predicted = np.empty(times.size)
+    for i in range(times.size):
+        f.update(positions[i], times[i])
+        predicted[i] = f.predict(times[i] + lead)
+    known = times + lead <= times[-1]
+    if not known.any():
+        return 0.0, 0.0
+    actual = np.interp(times[known] + lead, times, positions)
+    filter_rms = float(np.sqrt(np.mean((predicted[known] - actual) ** 2)))
+    hold_rms = float(np.sqrt(np.mean((positions[known] - actual) ** 2)))
+    return filter_rms, hold_rms
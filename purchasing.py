@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+# Main loop outcomes the scheduler counts
+#   catch   - a fish was tracked until the minigame ended (what the fish counter counts)
+#   loss    - a bite whose bar went away before any fish was tracked
+#   timeout - a cast that got no bite within the scan timeout
+EVENTS = ('catch', 'loss', 'timeout')
+
+# Bites of bait kept in hand when buying ahead, so a slightly low estimate
+# costs one early purchase instead of an empty cast and a scan timeout
+PURCHASE_RESERVE = 1
+
+# Timeouts in a row taken as running dry even when the estimate says bait is left
+DRY_TIMEOUTS = 2
+
+
+class PurchaseScheduler:
+    """Decides when to run the purchase flow from what the main loop observed.
+
+    Bait goes per bite (a catch or a loss), not per cast: a cast that times
+    out without a bite spends nothing. The scheduler estimates the bites left
+    from what was bought and the bites since, and buys once that drops to
+    reserve, so one slow purchase flow covers a whole batch instead of
+    running every few loops. A timeout with the estimate at reserve or below
+    also buys. DRY_TIMEOUTS in a row are taken as running dry whatever the
+    estimate: it buys right away and, from the second dry spell on, learns
+    how many bites one unit of bait really lasts from the bites and units
+    in between.
+
+    Every decision goes to a bounded log (decisions(), dump()) with the
+    estimate and reason behind it.
+    """
+    def __init__(self, reserve=PURCHASE_RESERVE, clock=time.monotonic, history=500):
+        self.reserve = reserve
+        self.clock = clock
+        self.history = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        self.started = self.clock()
+        self.counts = {event: 0 for event in EVENTS}
+        # Estimated bites left; None until the first purchase or dry spell
+        self.stock = None
+        self.bites_per_unit = 1.0
+        self.timeout_streak = 0
+        # Since the last dry spell, once one was seen: units bought and bites spent
+        self.synced = False
+        self.bought_since_dry = 0
+        self.bites_since_dry = 0
+        self.purchases = 0
+        self.purchase_seconds = 0.0
+        self.history.clear()
+
+    def record(self, event):
+        """Count a main loop outcome (see EVENTS)"""
+        self.counts[event] += 1
+        if event == 'timeout':
+            self.timeout_streak += 1
+            return
+        self.timeout_streak = 0
+        self.bites_since_dry += 1
+        if self.stock is not None:
+            self.stock = max(0.0, self.stock - 1)
+
+    def due(self, event):
+        """Whether to buy now, right after the main loop recorded event; the decision is logged"""
+        if event == 'timeout':
+            if self.timeout_streak >= DRY_TIMEOUTS:
+                self._ran_dry()
+                return self._decide(event, True, f'{self.timeout_streak} timeouts in a row, taken as out of bait')
+            if self.stock is not None and self.stock <= self.reserve:
+                return self._decide(event, True, 'no bite with bait estimated low')
+            return self._decide(event, False, 'single timeout')
+        if self.stock is None:
+            return self._decide(event, False, 'bait left unknown until the first purchase or dry spell')
+        if self.stock <= self.reserve:
+            return self._decide(event, True, f'estimate at reserve ({self.reserve})')
+        return self._decide(event, False, 'bait estimated left')
+
+    def _ran_dry(self):
+        if self.synced and self.bought_since_dry > 0 and self.bites_since_dry > 0:
+            observed = self.bites_since_dry / self.bought_since_dry
+            # Smoothed, so one false dry spell (fish just not biting) does not swing the estimate
+            self.bites_per_unit = 0.5 * self.bites_per_unit + 0.5 * observed
+        self.synced = True
+        self.bought_since_dry = 0
+        self.bites_since_dry = 0
+        self.stock = 0.0
+
+    def _decide(self, event, buy, reason):
+        entry = {
+            't': round(self.clock() - self.started, 3),
+            'event': event,
+            'decision': 'buy' if buy else 'wait',
+            'reason': reason,
+            'stock': None if self.stock is None else round(self.stock, 2),
+            'bites_per_unit': round(self.bites_per_unit, 3),
+            'timeout_streak': self.timeout_streak,
+        }
+        self.history.append(entry)
+        log.log(logging.INFO if buy else logging.DEBUG, 'Purchase scheduler: %s after %s (%s, stock %s)',
+                entry['decision'], event, reason, entry['stock'])
+        return buy
+
+    def purchased(self, amount, seconds):
+        """Credit a completed purchase of amount units that took seconds"""
+        amount = max(0, int(amount))
+        self.purchases += 1
+        self.purchase_seconds += seconds
+        self.bought_since_dry += amount
+        self.stock = (self.stock or 0.0) + amount * self.bites_per_unit
+        self.timeout_streak = 0
+
+    def decisions(self):
+        return list(self.history)
+
+    def stats(self):
+        """Outcome counts, the current estimate and purchase overhead per bite"""
+        bites = self.counts['catch'] + self.counts['loss']
+        elapsed = max(1e-9, self.clock() - self.started)
+        return {
+            'counts': dict(self.counts),
+            'stock': self.stock,
+            'bites_per_unit': self.bites_per_unit,
+            'purchases': self.purchases,
+            'purchase_seconds': self.purchase_seconds,
+            'overhead_per_bite_s': self.purchase_seconds / bites if bites else None,
+            'bites_per_hour': bites / elapsed * 3600.0,
+        }
+
+    def dump(self, path):
+        """Write stats and the decision log to a JSON file"""
+        report = {'created': datetime.now().isoformat(), 'stats': self.stats(), 'decisions': self.decisions()}
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,96 @@
+import threading
+import time
+
+
+class DutyCycleDriver:
+    """Turns a continuous PD output into a hold/release duty cycle on its own thread.
+
+    Every carrier period (1 / frequency seconds) the button is held for duty *
+    period and released for the rest, independent of how often detection
+    produces a new output. An output of 0 gives 50% duty, +full_scale or more
+    holds continuously and -full_scale or less releases continuously. Pulses
+    shorter than min_pulse are skipped so the game never sees a click it
+    cannot register.
+
+    set_button(hold) is the only way the driver touches input, so tests and
+    headless runs can pass a recorder instead of the real mouse.
+    """
+    def __init__(self, set_button, frequency=30.0, full_scale=0.1, min_pulse=0.004):
+        self.set_button = set_button
+        self.frequency = frequency
+        self.full_scale = full_scale
+        self.min_pulse = min_pulse
+        # None = idle: released and waiting for an output
+        self.duty = None
+        self.holding = False
+        self.wake = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        self.periods = 0
+        self.toggles = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the thread and leave the button released"""
+        self.running = False
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        with self.lock:
+            self.duty = None
+            self._set(False)
+
+    def duty_for(self, output):
+        return min(1.0, max(0.0, 0.5 + output / (2.0 * self.full_scale)))
+
+    def set_output(self, output):
+        """Use a new PD output from the next carrier period on"""
+        self.duty = self.duty_for(output)
+        self.wake.set()
+
+    def pause(self):
+        """Release the button and idle until the next set_output(); returns once released"""
+        with self.lock:
+            self.duty = None
+            self._set(False)
+
+    def _set(self, hold):
+        if hold != self.holding:
+            self.set_button(hold)
+            self.holding = hold
+            self.toggles += 1
+
+    def _run(self):
+        while self.running:
+            self.wake.clear()
+            duty = self.duty
+            if duty is None:
+                self.wake.wait(0.5)
+                continue
+            period = 1.0 / self.frequency
+            on = duty * period
+            if on < self.min_pulse:
+                on = 0.0
+            elif period - on < self.min_pulse:
+                on = period
+            self.periods += 1
+            with self.lock:
+                # pause() may have run since duty was read
+                if self.duty is not None:
+                    self._set(on > 0)
+            if 0 < on < period:
+                time.sleep(on)
+                with self.lock:
+                    self._set(False)
+                time.sleep(period - on)
+            else:
+                time.sleep(period)
+
+    def stats(self):
+        return {'frequency': self.frequency, 'duty': self.duty, 'periods': self.periods, 'toggles': self.toggles}
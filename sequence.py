@@ -0,0 +1,218 @@
+import copy
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# Step types a sequence can use, with the keys each one reads:
+#   key            - key: key name, e.g. "e"
+#   click          - point: point number (1-4) or [x, y]
+#   right_click    - point
+#   type           - text: "{amount}" is replaced by the auto purchase amount
+#   wait           - seconds: number or the name of a delay setting
+#   wait_for_pixel - point, timeout (number or setting name); with color [r, g, b]
+#                    and optional tolerance it waits for that pixel color,
+#                    otherwise for the UI around point to change from how it
+#                    was before the previous step and settle the way it did
+#                    the last time (see ScreenConfirmer). Without screen
+#                    checks, or when the previous step does not change point,
+#                    it waits the full timeout.
+# Any step may carry a label used in logs and stats.
+ACTIONS = ('key', 'click', 'right_click', 'type', 'wait', 'wait_for_pixel')
+
+DEFAULT_PURCHASE_SEQUENCE = [
+    {'action': 'key', 'key': 'e', 'label': 'open shop'},
+    {'action': 'wait_for_pixel', 'point': 1, 'timeout': 'purchase_delay_after_key'},
+    {'action': 'click', 'point': 1},
+    {'action': 'wait_for_pixel', 'point': 2, 'timeout': 'purchase_click_delay'},
+    {'action': 'click', 'point': 2, 'label': 'amount field'},
+    {'action': 'wait_for_pixel', 'point': 2, 'timeout': 'purchase_click_delay'},
+    {'action': 'type', 'text': '{amount}'},
+    {'action': 'wait_for_pixel', 'point': 1, 'timeout': 'purchase_after_type_delay'},
+    {'action': 'click', 'point': 1},
+    {'action': 'wait_for_pixel', 'point': 3, 'timeout': 'purchase_click_delay'},
+    {'action': 'click', 'point': 3, 'label': 'confirm'},
+    {'action': 'wait_for_pixel', 'point': 2, 'timeout': 'purchase_click_delay'},
+    {'action': 'click', 'point': 2},
+    {'action': 'wait_for_pixel', 'point': 4, 'timeout': 'purchase_click_delay'},
+    {'action': 'right_click', 'point': 4, 'label': 'back to water'},
+    {'action': 'wait_for_pixel', 'point': 4, 'timeout': 'purchase_click_delay'},
+]
+
+DEFAULT_CANCEL_SEQUENCE = [
+    {'action': 'click', 'point': 3, 'label': 'cancel order'},
+    {'action': 'wait_for_pixel', 'point': 2, 'timeout': 'purchase_click_delay'},
+    {'action': 'click', 'point': 2, 'label': 'close menu'},
+    {'action': 'wait_for_pixel', 'point': 4, 'timeout': 'purchase_click_delay'},
+    {'action': 'right_click', 'point': 4, 'label': 'back to water'},
+    {'action': 'wait_for_pixel', 'point': 4, 'timeout': 'purchase_click_delay'},
+]
+
+
+def default_sequences():
+    """Fresh copies of the built-in purchase and cancel sequences"""
+    return copy.deepcopy(DEFAULT_PURCHASE_SEQUENCE), copy.deepcopy(DEFAULT_CANCEL_SEQUENCE)
+
+
+class Action:
+    """One compiled step, with its point, text and seconds resolved from the settings"""
+    def __init__(self, index, kind, label, point=None, key=None, text=None, seconds=0.0, color=None,
+                 tolerance=0):
+        self.index = index
+        self.kind = kind
+        self.label = label
+        self.point = point
+        self.key = key
+        self.text = text
+        self.seconds = seconds
+        self.color = color
+        self.tolerance = tolerance
+
+
+def _point(step, settings):
+    point = step.get('point')
+    if isinstance(point, (list, tuple)) and len(point) == 2:
+        return int(point[0]), int(point[1])
+    try:
+        number = int(point)
+    except (TypeError, ValueError):
+        raise ValueError(f'bad point {point!r}')
+    coords = (settings.point_coords or {}).get(number)
+    if not coords:
+        raise ValueError(f'point {number} is not set')
+    return int(coords[0]), int(coords[1])
+
+
+def _seconds(value, settings):
+    if isinstance(value, str):
+        if not hasattr(settings, value):
+            raise ValueError(f'unknown delay setting {value!r}')
+        value = getattr(settings, value)
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        raise ValueError(f'bad delay {value!r}')
+
+
+def compile_sequence(steps, settings):
+    """Resolve preset steps into Actions against the current settings.
+
+    Everything that can be wrong with a step (unknown action, unset point,
+    missing key, a value of the wrong type) raises ValueError here, before
+    any input is sent, so a bad sequence never runs halfway.
+    """
+    actions = []
+    for index, step in enumerate(steps, 1):
+        try:
+            kind = step.get('action')
+            if kind not in ACTIONS:
+                raise ValueError(f'unknown action {kind!r}')
+            label = step.get('label')
+            if kind == 'key':
+                if not step.get('key'):
+                    raise ValueError('key step without a key')
+                action = Action(index, kind, label or f'key {step["key"]}', key=str(step['key']))
+            elif kind in ('click', 'right_click'):
+                point = _point(step, settings)
+                action = Action(index, kind, label or f'{kind.replace("_", "-")} point {step["point"]}',
+                                point=point)
+            elif kind == 'type':
+                text = str(step.get('text', '{amount}')).format(amount=settings.auto_purchase_amount)
+                action = Action(index, kind, label or 'type text', text=text)
+            elif kind == 'wait':
+                action = Action(index, kind, label or 'wait', seconds=_seconds(step.get('seconds', 0), settings))
+            else:
+                point = _point(step, settings)
+                color = step.get('color')
+                if color is not None and len(color) != 3:
+                    raise ValueError(f'bad color {color!r}, expected [r, g, b]')
+                action = Action(index, kind, label or f'wait for point {step["point"]}', point=point,
+                                seconds=_seconds(step.get('timeout', 'purchase_click_delay'), settings),
+                                color=tuple(int(c) for c in color) if color is not None else None,
+                                tolerance=int(step.get('tolerance', 0)))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f'step {index}: {e}')
+        actions.append(action)
+    return actions
+
+
+class SequenceRunner:
+    """Runs compiled sequences through an InputBackend and times every step.
+
+    wait(seconds, stage) and wait_for_pixel(step, action) do all the
+    waiting and return True to abort the sequence (the engine passes its
+    CancelToken and screen checks). Before an input step that a
+    wait_for_pixel step follows, before_input(step, action) is called with
+    that wait step, so the screen can be captured as it was before the input.
+    Clicks hold the button for click_hold seconds.
+    """
+    def __init__(self, backend, wait, wait_for_pixel, click_hold=0.05, before_input=None):
+        self.backend = backend
+        self.wait = wait
+        self.wait_for_pixel = wait_for_pixel
+        self.click_hold = click_hold
+        self.before_input = before_input
+        # name -> {index: [label, runs, total_s, max_s]}
+        self.timings = {}
+        # name -> [runs, completed, total_s]
+        self.totals = {}
+
+    def _do(self, name, action):
+        """Perform one action; True when the sequence was aborted"""
+        if action.kind == 'key':
+            self.backend.press_key(action.key)
+        elif action.kind == 'type':
+            self.backend.type_text(action.text)
+        elif action.kind in ('click', 'right_click'):
+            button = 'left' if action.kind == 'click' else 'right'
+            try:
+                self.backend.click_at(action.point[0], action.point[1], button, hold=self.click_hold)
+            except Exception as e:
+                log.error('%s step %d: error clicking at %s: %s', name, action.index, action.point, e)
+        elif action.kind == 'wait':
+            return self.wait(action.seconds, name)
+        else:
+            return self.wait_for_pixel(f'{name}:{action.index}', action)
+        return False
+
+    def run(self, name, actions):
+        """Run actions in order; True when all ran, False when a wait aborted them"""
+        timings = self.timings.setdefault(name, {})
+        totals = self.totals.setdefault(name, [0, 0, 0.0])
+        started = time.perf_counter()
+        completed = True
+        for position, action in enumerate(actions):
+            log.debug('%s step %d: %s', name, action.index, action.label)
+            following = actions[position + 1] if position + 1 < len(actions) else None
+            if (self.before_input is not None and action.kind not in ('wait', 'wait_for_pixel')
+                    and following is not None and following.kind == 'wait_for_pixel'):
+                self.before_input(f'{name}:{following.index}', following)
+            step_start = time.perf_counter()
+            aborted = self._do(name, action)
+            elapsed = time.perf_counter() - step_start
+            entry = timings.setdefault(action.index, [action.label, 0, 0.0, 0.0])
+            entry[0] = action.label
+            entry[1] += 1
+            entry[2] += elapsed
+            entry[3] = max(entry[3], elapsed)
+            if aborted:
+                completed = False
+                break
+        totals[0] += 1
+        totals[1] += completed
+        totals[2] += time.perf_counter() - started
+        return completed
+
+    def stats(self):
+        """Per sequence: runs, completed runs, mean duration and per-step mean/max in milliseconds"""
+        report = {}
+        for name, (runs, completed, total) in self.totals.items():
+            report[name] = {
+                'runs': runs,
+                'completed': completed,
+                'mean_ms': total / runs * 1000.0 if runs else 0.0,
+                'steps': [{'step': index, 'label': label, 'runs': n, 'mean_ms': t / n * 1000.0,
+                           'max_ms': m * 1000.0}
+                          for index, (label, n, t, m) in sorted(self.timings.get(name, {}).items())],
+            }
+        return report
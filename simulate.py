@@ -0,0 +1,346 @@
+"""Offline PD controller simulator and kp/kd tuner.
+
+Replays fish trajectories against a simple model of the minigame and scores
+a kp/kd pair by the fraction of time the fish stays inside the player's zone.
+A grid of kp/kd values is searched in parallel across CPU cores (optionally
+zooming in around the best cell) and the winner is written as a preset.
+
+    python simulate.py --trace traces/session1.jsonl --base presets/default.json --output presets/tuned.json
+    python simulate.py --replay recordings/session1 --fps 60
+    python simulate.py --synthetic 8 --rounds 3
+
+The model follows the engine's sign convention: the error is the largest
+dark section's middle (the player's zone) minus the white marker's row (the
+fish), and a positive PD output holds the button, so holding makes the zone
+rise (move to smaller rows) and releasing lets it fall. Positions are
+fractions of the track height, 0 at the top, like the engine's normalized
+error.
+"""
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+from controller import PDController
+from prediction import MotionPredictor, prediction_error
+
+
+class Trajectory:
+    """Fish positions (fractions of the track height, 0 = top) at increasing times in seconds"""
+    def __init__(self, times, fish, name=''):
+        self.times = np.asarray(times, dtype=np.float64)
+        self.fish = np.asarray(fish, dtype=np.float64)
+        self.name = name
+
+    def __len__(self):
+        return self.times.size
+
+    @property
+    def duration(self):
+        return float(self.times[-1] - self.times[0]) if len(self) > 1 else 0.0
+
+
+def _split(times, fish, name, max_gap, min_frames):
+    """Cut a sample stream into trajectories wherever consecutive samples are more than max_gap apart"""
+    times = np.asarray(times, dtype=np.float64)
+    fish = np.asarray(fish, dtype=np.float64)
+    if times.size == 0:
+        return []
+    cuts = np.flatnonzero(np.diff(times) > max_gap) + 1
+    out = []
+    for i, (t, f) in enumerate(zip(np.split(times, cuts), np.split(fish, cuts))):
+        if t.size >= min_frames:
+            out.append(Trajectory(t, f, f'{name}#{i}'))
+    return out
+
+
+def load_trace(path, max_gap=0.5, min_frames=30):
+    """Trajectories from an engine trace file (telemetry.TraceWriter JSON lines), one per fish"""
+    times = []
+    fish = []
+    with open(path, 'r') as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('height'):
+                times.append(record['t'])
+                fish.append((record['marker_y'] - record['track_y']) / record['height'])
+    return _split(times, fish, os.path.basename(path), max_gap, min_frames)
+
+
+def load_recording(path, fps=60.0, tolerance=0, min_frames=30):
+    """Trajectories from recorded overlay frames (see capture.ReplayFrameSource), one per fish.
+
+    Runs the engine's detection on every frame; frames are assumed fps apart
+    and a frame without a detection ends the current fish.
+    """
+    from capture import ReplayFrameSource
+    from detection import BLUE_COLOR, DARK_COLOR, WHITE_COLOR, get_matcher, find_blue_bar, find_vertical_bounds
+    blue = get_matcher(BLUE_COLOR, tolerance)
+    dark = get_matcher(DARK_COLOR, tolerance)
+    white = get_matcher(WHITE_COLOR, tolerance)
+    times = []
+    fish = []
+    area = {'x': 0, 'y': 0, 'width': 0, 'height': 0}
+    with ReplayFrameSource(path) as source:
+        index = 0
+        while True:
+            frame = source.grab(area)
+            if frame is None:
+                break
+            index += 1
+            bar = find_blue_bar(frame.img, blue)
+            if bar is None:
+                continue
+            temp_img = frame.img[:, bar[1]:bar[2] + 1]
+            top, bottom = find_vertical_bounds(temp_img, dark)
+            if top is None:
+                continue
+            white_top, _ = find_vertical_bounds(temp_img[top:bottom + 1], white)
+            if white_top is None:
+                continue
+            times.append(index / fps)
+            fish.append(white_top / (bottom - top + 1))
+    return _split(times, fish, os.path.basename(os.path.normpath(path)), 1.5 / fps, min_frames)
+
+
+def synthetic_trajectories(count=4, seconds=20.0, fps=60.0, seed=0):
+    """Fish that wander as a sum of random sinusoids plus jitter, for tuning without recordings"""
+    rng = np.random.default_rng(seed)
+    times = np.arange(int(seconds * fps)) / fps
+    out = []
+    for i in range(count):
+        fish = np.full(times.size, 0.5)
+        for _ in range(3):
+            amplitude = rng.uniform(0.05, 0.15)
+            period = rng.uniform(1.0, 5.0)
+            fish += amplitude * np.sin(2 * math.pi * times / period + rng.uniform(0, 2 * math.pi))
+        fish += rng.normal(0.0, 0.005, times.size)
+        out.append(Trajectory(times, np.clip(fish, 0.05, 0.95), f'synthetic#{i}'))
+    return out
+
+
+class MarkerPhysics:
+    """Motion of the player's zone, in track heights and seconds.
+
+    Holding accelerates the zone upward by lift, releasing accelerates it
+    downward by gravity; speed is capped at max_speed and the zone stops at
+    either end of the track. zone_size is the zone's height as a fraction of
+    the track.
+    """
+    def __init__(self, lift=3.0, gravity=3.0, max_speed=1.5, zone_size=0.14, substep=1 / 240):
+        self.lift = lift
+        self.gravity = gravity
+        self.max_speed = max_speed
+        self.zone_size = zone_size
+        self.substep = substep
+
+    def step(self, position, velocity, hold, dt):
+        """Advance position/velocity arrays in place by dt seconds with the button held where hold"""
+        steps = max(1, int(math.ceil(dt / self.substep)))
+        h = dt / steps
+        half = self.zone_size / 2
+        accel = np.where(hold, -self.lift, self.gravity)
+        for _ in range(steps):
+            velocity += accel * h
+            np.clip(velocity, -self.max_speed, self.max_speed, out=velocity)
+            position += velocity * h
+            at_wall = (position < half) | (position > 1 - half)
+            velocity[at_wall] = 0.0
+            np.clip(position, half, 1 - half, out=position)
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+def simulate(trajectory, kp, kd, physics, latency=0.0, options=None):
+    """Time-in-zone fraction of each (kp, kd) pair on one trajectory.
+
+    kp and kd are equal-length arrays, simulated side by side through one
+    vectorized PDController. options holds the other controller preset keys
+    (derivative_filter, hysteresis, predictive_tracking). The controller sees
+    each trajectory sample at its timestamp like the engine sees frames, and
+    each decision takes effect latency seconds later; with predictive_tracking
+    it aims at the positions predicted for that moment, as the engine does.
+    """
+    kp = np.asarray(kp, dtype=np.float64)
+    kd = np.asarray(kd, dtype=np.float64)
+    n = kp.size
+    times = trajectory.times
+    fish = trajectory.fish
+    position = np.full(n, 0.5)
+    velocity = np.zeros(n)
+    options = options or {}
+    controller = PDController(kp, kd, derivative_filter=options.get('derivative_filter', 0.0),
+                              hysteresis=options.get('hysteresis', 0.0))
+    predictor = MotionPredictor() if options.get('predictive_tracking') else None
+    hold = np.zeros(n, dtype=bool)
+    controller.hold = hold
+    pending = []
+    in_zone = np.zeros(n)
+    half = physics.zone_size / 2
+    for k in range(times.size - 1):
+        t = times[k]
+        error = position - fish[k]
+        seen = error
+        if predictor is not None:
+            predictor.update(position, fish[k], t)
+            zone, target = predictor.predict(t + latency)
+            seen = zone - target
+        pending.append((t + latency, controller.decide(seen, t)))
+        dt = times[k + 1] - t
+        in_zone += (np.abs(error) <= half) * dt
+        # Apply decisions as they come due, splitting the step at each one
+        now = t
+        while pending and pending[0][0] < times[k + 1]:
+            due, decision = pending.pop(0)
+            if due > now:
+                physics.step(position, velocity, hold, due - now)
+                now = due
+            hold = decision
+        physics.step(position, velocity, hold, times[k + 1] - now)
+    duration = trajectory.duration
+    return in_zone / duration if duration > 0 else in_zone
+
+
+def evaluate(trajectories, kp, kd, physics, latency=0.0, options=None):
+    """Duration-weighted mean time-in-zone over trajectories for arrays of kp/kd pairs"""
+    total = sum(t.duration for t in trajectories)
+    score = np.zeros(np.asarray(kp).size)
+    for trajectory in trajectories:
+        score += simulate(trajectory, kp, kd, physics, latency, options) * trajectory.duration
+    return score / total if total > 0 else score
+
+
+def _evaluate_chunk(args):
+    return evaluate(*args)
+
+
+def grid_search(trajectories, kp_values, kd_values, physics, latency=0.0, workers=None, options=None):
+    """Score every kp/kd combination, split across worker processes; returns a (kp, kd) score grid"""
+    kp_grid, kd_grid = np.meshgrid(kp_values, kd_values, indexing='ij')
+    kp_flat = kp_grid.ravel()
+    kd_flat = kd_grid.ravel()
+    workers = workers or os.cpu_count() or 1
+    chunks = np.array_split(np.arange(kp_flat.size), min(workers, kp_flat.size))
+    jobs = [(trajectories, kp_flat[c], kd_flat[c], physics, latency, options) for c in chunks]
+    if workers == 1:
+        scores = [_evaluate_chunk(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scores = list(pool.map(_evaluate_chunk, jobs))
+    return np.concatenate(scores).reshape(kp_grid.shape)
+
+
+def tune(trajectories, kp_range, kd_range, steps=12, rounds=2, physics=None, latency=0.0, workers=None, options=None):
+    """Grid search kp/kd, then repeatedly zoom the grid in around the best cell.
+
+    Returns (kp, kd, score, history) where history lists the best pair of
+    every round.
+    """
+    physics = physics if physics is not None else MarkerPhysics()
+    kp_lo, kp_hi = kp_range
+    kd_lo, kd_hi = kd_range
+    history = []
+    best = None
+    for _ in range(max(1, rounds)):
+        kp_values = np.linspace(kp_lo, kp_hi, steps)
+        kd_values = np.linspace(kd_lo, kd_hi, steps)
+        scores = grid_search(trajectories, kp_values, kd_values, physics, latency, workers, options)
+        i, j = np.unravel_index(int(scores.argmax()), scores.shape)
+        kp, kd, score = float(kp_values[i]), float(kd_values[j]), float(scores[i, j])
+        if best is None or score > best[2]:
+            best = (kp, kd, score)
+        history.append({'kp': kp, 'kd': kd, 'score': score,
+                        'kp_range': [float(kp_lo), float(kp_hi)], 'kd_range': [float(kd_lo), float(kd_hi)]})
+        kp_step = (kp_hi - kp_lo) / max(1, steps - 1)
+        kd_step = (kd_hi - kd_lo) / max(1, steps - 1)
+        kp_lo, kp_hi = max(0.0, kp - kp_step), kp + kp_step
+        kd_lo, kd_hi = max(0.0, kd - kd_step), kd + kd_step
+    return best[0], best[1], best[2], history
+
+
+def write_preset(path, kp, kd, base=None, tuning=None, options=None):
+    """Write a preset with the tuned kp/kd (and controller options), keeping every other setting from base"""
+    preset_data = {}
+    if base:
+        with open(base, 'r') as f:
+            preset_data = json.load(f)
+    preset_data['kp'] = round(kp, 4)
+    preset_data['kd'] = round(kd, 4)
+    preset_data.update(options or {})
+    preset_data['created'] = datetime.now().isoformat()
+    if tuning is not None:
+        preset_data['tuning'] = tuning
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(preset_data, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate the PD controller on recorded fish and tune kp/kd')
+    parser.add_argument('--trace', nargs='+', default=[], help='engine trace files (.jsonl)')
+    parser.add_argument('--replay', nargs='+', default=[], help='recorded frame directories or .npz files')
+    parser.add_argument('--fps', type=float, default=60.0, help='frame rate the --replay recordings were made at')
+    parser.add_argument('--synthetic', type=int, default=0, help='number of synthetic fish (used when nothing else is given)')
+    parser.add_argument('--kp-range', type=float, nargs=2, default=[0.0, 1.0], metavar=('MIN', 'MAX'))
+    parser.add_argument('--kd-range', type=float, nargs=2, default=[0.0, 2.0], metavar=('MIN', 'MAX'))
+    parser.add_argument('--steps', type=int, default=12, help='grid points per axis')
+    parser.add_argument('--rounds', type=int, default=2, help='grid rounds, each zoomed in around the previous best')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--latency', type=float, default=0.03, help='seconds from frame to input taking effect')
+    parser.add_argument('--lift', type=float, default=3.0, help='upward acceleration while held (track heights/s^2)')
+    parser.add_argument('--gravity', type=float, default=3.0, help='downward acceleration while released (track heights/s^2)')
+    parser.add_argument('--max-speed', type=float, default=1.5, help='speed cap (track heights/s)')
+    parser.add_argument('--zone-size', type=float, default=0.14, help='player zone height as a fraction of the track')
+    parser.add_argument('--derivative-filter', type=float, default=None, help='derivative smoothing (s), default from --base')
+    parser.add_argument('--hysteresis', type=float, default=None, help='hold/release dead band, default from --base')
+    parser.add_argument('--predict', action='store_true', default=None, help='enable predictive tracking (default from --base)')
+    parser.add_argument('--base', help='preset to copy other settings from and score as the baseline')
+    parser.add_argument('--output', default=os.path.join('presets', 'tuned.json'), help='preset file to write')
+    args = parser.parse_args(argv)
+
+    trajectories = []
+    for path in args.trace:
+        trajectories += load_trace(path)
+    for path in args.replay:
+        trajectories += load_recording(path, args.fps)
+    if args.synthetic or not trajectories:
+        trajectories += synthetic_trajectories(args.synthetic or 4, fps=args.fps)
+    seconds = sum(t.duration for t in trajectories)
+    print(f'{len(trajectories)} trajectories, {seconds:.0f} s total')
+
+    physics = MarkerPhysics(args.lift, args.gravity, args.max_speed, args.zone_size)
+    base = {}
+    if args.base:
+        with open(args.base, 'r') as f:
+            base = json.load(f)
+    options = {
+        'derivative_filter': args.derivative_filter if args.derivative_filter is not None else base.get('derivative_filter', 0.0),
+        'hysteresis': args.hysteresis if args.hysteresis is not None else base.get('hysteresis', 0.0),
+        'predictive_tracking': args.predict if args.predict is not None else base.get('predictive_tracking', False),
+    }
+    if options['predictive_tracking']:
+        errors = [prediction_error(t.times, t.fish, args.latency) for t in trajectories]
+        print(f'fish prediction {args.latency * 1000:.0f} ms ahead: RMS {np.mean([e[0] for e in errors]):.4f} '
+              f'(last sample: {np.mean([e[1] for e in errors]):.4f}) track heights')
+    if args.base:
+        base_kp, base_kd = base.get('kp', 0.1), base.get('kd', 0.5)
+        base_score = float(evaluate(trajectories, [base_kp], [base_kd], physics, args.latency, options)[0])
+        print(f'baseline kp={base_kp} kd={base_kd}: {base_score:.1%} time in zone')
+
+    kp, kd, score, history = tune(trajectories, args.kp_range, args.kd_range, args.steps, args.rounds,
+                                  physics, args.latency, args.workers, options)
+    for i, entry in enumerate(history):
+        print(f"round {i + 1}: kp={entry['kp']:.4f} kd={entry['kd']:.4f} {entry['score']:.1%} time in zone")
+    tuning = {'score': score, 'latency': args.latency, 'physics': physics.to_dict(),
+              'trajectories': len(trajectories), 'seconds': seconds, 'rounds': history}
+    write_preset(args.output, kp, kd, args.base, tuning, options)
+    print(f'Best kp={kp:.4f} kd={kd:.4f} ({score:.1%} time in zone), preset written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
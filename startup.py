@@ -0,0 +1,58 @@
+import importlib
+import logging
+import sys
+import time
+
+log = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Startup milestones and the time spent in each deferred import.
+
+    Times are perf_counter seconds from when this module was first imported,
+    which z.py does before anything else, so interpreter startup itself is
+    not included (python -X importtime covers that).
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.last = self.started
+        # (milestone, seconds since start, seconds since the previous milestone)
+        self.marks = []
+        self.imports = {}
+
+    def mark(self, name):
+        now = self.clock()
+        self.marks.append((name, now - self.started, now - self.last))
+        self.last = now
+
+    def load(self, name):
+        """Import module name, timing it the first time it is actually loaded"""
+        if name in sys.modules:
+            return sys.modules[name]
+        started = self.clock()
+        module = importlib.import_module(name)
+        self.imports[name] = self.clock() - started
+        return module
+
+    def summary(self):
+        return {'milestones_ms': {name: at * 1000.0 for name, at, _ in self.marks},
+                'imports_ms': {name: seconds * 1000.0 for name, seconds in self.imports.items()}}
+
+    def report(self):
+        """Milestones and deferred imports as aligned text lines"""
+        lines = ['Startup milestones (ms since start, ms for the step):']
+        lines += [f'  {name:<24} {at * 1000.0:8.1f} {step * 1000.0:8.1f}' for name, at, step in self.marks]
+        if self.imports:
+            lines.append('Deferred imports (ms):')
+            lines += [f'  {name:<24} {seconds * 1000.0:8.1f}'
+                      for name, seconds in sorted(self.imports.items(), key=lambda item: -item[1])]
+        return '\n'.join(lines)
+
+
+STARTUP = StartupTimer()
+
+
+def lazy_import(name):
+    """Import a module on first use, recording how long it took in STARTUP"""
+    return STARTUP.load(name)
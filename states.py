@@ -0,0 +1,67 @@
+import time
+
+CASTING = 'casting'
+WAITING_FOR_BITE = 'waiting_for_bite'
+REELING = 'reeling'
+LOST = 'lost'
+PURCHASING = 'purchasing'
+RECOVERING = 'recovering'
+
+STATES = (CASTING, WAITING_FOR_BITE, REELING, LOST, PURCHASING, RECOVERING)
+
+# Per-state loop policy: which settings attribute sets the frame rate and which
+# part of the overlay is scanned. States without a policy run blocking actions
+# (casting, purchasing, ...) and never grab frames.
+#   'bite' - a thin band around the row the blue bar last appeared on
+#   'full' - the whole overlay
+STATE_POLICIES = {
+    WAITING_FOR_BITE: {'fps': 'idle_fps', 'roi': 'bite'},
+    REELING: {'fps': 'tracking_fps', 'roi': 'full'},
+}
+
+# Allowed transitions; anything else is a bug in the loop
+TRANSITIONS = {
+    None: (CASTING, PURCHASING),
+    PURCHASING: (CASTING,),
+    CASTING: (WAITING_FOR_BITE,),
+    WAITING_FOR_BITE: (REELING, RECOVERING),
+    # Purchasing straight from reeling when the bar went away before a fish was tracked
+    REELING: (WAITING_FOR_BITE, LOST, PURCHASING),
+    LOST: (PURCHASING, CASTING),
+    RECOVERING: (CASTING, PURCHASING),
+}
+
+
+class FishingStateMachine:
+    """Current phase of the fishing loop, with time-in-state accounting"""
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.state = None
+        self.entered_at = clock()
+        self.time_in_state = {state: 0.0 for state in STATES}
+        self.entries = {state: 0 for state in STATES}
+
+    def enter(self, new_state):
+        """Move to new_state, crediting the time spent in the current one"""
+        if new_state not in TRANSITIONS[self.state]:
+            raise ValueError(f'Invalid transition {self.state} -> {new_state}')
+        now = self.clock()
+        if self.state is not None:
+            self.time_in_state[self.state] += now - self.entered_at
+        self.state = new_state
+        self.entered_at = now
+        self.entries[new_state] += 1
+
+    def elapsed(self):
+        """Seconds spent in the current state so far"""
+        return self.clock() - self.entered_at
+
+    def policy(self):
+        return STATE_POLICIES.get(self.state)
+
+    def stats(self):
+        """Total seconds and entry count per state, including the current stay"""
+        totals = dict(self.time_in_state)
+        if self.state is not None:
+            totals[self.state] += self.elapsed()
+        return {state: {'seconds': totals[state], 'entries': self.entries[state]} for state in STATES}
@@ -0,0 +1,158 @@
+import math
+import numpy as np
+from detection import BLUE_COLOR, DARK_COLOR, WHITE_COLOR
+
+# Colors that never match the detection targets, as (r, g, b)
+BACKGROUND_COLOR = (34, 49, 63)
+TRACK_COLOR = (70, 110, 140)
+
+# Default overlay size the geometry below is laid out for
+BASE_WIDTH = 172
+BASE_HEIGHT = 495
+
+
+class MinigameParams:
+    """Geometry of one minigame frame, in pixels of a BASE_WIDTH x BASE_HEIGHT overlay.
+
+    Everything is multiplied by scale when rendering, so the same params give
+    DPI-scaled frames. Positions are rows/columns inside the overlay.
+    """
+    def __init__(self, bar_row=20, bar_left=60, bar_width=52, bar_thickness=4,
+                 track_top=40, track_height=420, border=3,
+                 marker_top=240, marker_height=6,
+                 zone_middle=200, zone_size=60, noise=0.0, scale=1.0):
+        self.bar_row = bar_row
+        self.bar_left = bar_left
+        self.bar_width = bar_width
+        self.bar_thickness = bar_thickness
+        self.track_top = track_top
+        self.track_height = track_height
+        self.border = border
+        self.marker_top = marker_top
+        self.marker_height = marker_height
+        self.zone_middle = zone_middle
+        self.zone_size = zone_size
+        self.noise = noise
+        self.scale = scale
+
+    def copy(self, **changes):
+        params = MinigameParams(**self.__dict__)
+        params.__dict__.update(changes)
+        return params
+
+    def overlay_size(self):
+        """(width, height) of the overlay these params are laid out for"""
+        return int(round(BASE_WIDTH * self.scale)), int(round(BASE_HEIGHT * self.scale))
+
+
+def _bgra(color):
+    r, g, b = color
+    return (b, g, r, 255)
+
+
+def render_frame(params, width=None, height=None, rng=None):
+    """Render one BGRA frame and return (img, truth).
+
+    truth holds the positions detection is expected to report, in overlay
+    rows/columns: bar_row/bar_left/bar_right, track_top/track_bottom,
+    white_top/white_bottom and zone_start/zone_end/zone_middle.
+    """
+    s = params.scale
+    if width is None or height is None:
+        width, height = params.overlay_size()
+
+    def px(v):
+        return int(round(v * s))
+
+    bar_row = px(params.bar_row)
+    bar_left = px(params.bar_left)
+    bar_right = bar_left + max(1, px(params.bar_width)) - 1
+    bar_bottom = bar_row + max(1, px(params.bar_thickness)) - 1
+    track_top = px(params.track_top)
+    track_bottom = track_top + max(1, px(params.track_height)) - 1
+    border = max(1, px(params.border))
+    marker_height = max(1, px(params.marker_height))
+    # Keep the marker and the fish zone inside the track interior
+    inner_top = track_top + border
+    inner_bottom = track_bottom - border
+    white_top = min(max(px(params.marker_top), inner_top), inner_bottom - marker_height + 1)
+    white_bottom = white_top + marker_height - 1
+    zone_size = max(1, px(params.zone_size))
+    zone_start = min(max(px(params.zone_middle) - zone_size // 2, inner_top), inner_bottom - zone_size + 1)
+    zone_end = zone_start + zone_size - 1
+
+    img = np.empty((height, width, 4), dtype=np.uint8)
+    img[:] = _bgra(BACKGROUND_COLOR)
+    cols = slice(bar_left, bar_right + 1)
+    img[bar_row:bar_bottom + 1, cols] = _bgra(BLUE_COLOR)
+    img[track_top:track_bottom + 1, cols] = _bgra(TRACK_COLOR)
+    img[track_top:track_top + border, cols] = _bgra(DARK_COLOR)
+    img[track_bottom - border + 1:track_bottom + 1, cols] = _bgra(DARK_COLOR)
+    img[zone_start:zone_end + 1, cols] = _bgra(DARK_COLOR)
+    img[white_top:white_bottom + 1, cols] = _bgra(WHITE_COLOR)
+
+    if params.noise > 0:
+        if rng is None:
+            rng = np.random.default_rng()
+        noise = rng.normal(0.0, params.noise, size=(height, width, 3))
+        img[:, :, :3] = np.clip(img[:, :, :3] + noise, 0, 255).astype(np.uint8)
+
+    truth = {
+        'bar_row': bar_row, 'bar_left': bar_left, 'bar_right': bar_right,
+        'track_top': track_top, 'track_bottom': track_bottom,
+        'white_top': white_top, 'white_bottom': white_bottom,
+        'zone_start': zone_start, 'zone_end': zone_end,
+        'zone_middle': (zone_start + zone_end) // 2,
+    }
+    return img, truth
+
+
+class MinigameScene:
+    """Minigame frames over time with a moving fish zone and white marker.
+
+    The zone swings sinusoidally around zone_center; the marker either follows
+    its own sinusoid or, with marker_follow > 0, chases the zone with that
+    fraction of the remaining distance per frame. Frame index i is at time
+    i / fps. Usable directly as a SyntheticFrameSource render callable.
+    """
+    def __init__(self, params=None, fps=60.0, zone_center=250, zone_amplitude=150, zone_period=3.0,
+                 marker_center=250, marker_amplitude=0, marker_period=2.0, marker_follow=0.0,
+                 jitter=0.0, seed=0):
+        self.params = params if params is not None else MinigameParams()
+        self.fps = fps
+        self.zone_center = zone_center
+        self.zone_amplitude = zone_amplitude
+        self.zone_period = zone_period
+        self.marker_center = marker_center
+        self.marker_amplitude = marker_amplitude
+        self.marker_period = marker_period
+        self.marker_follow = marker_follow
+        self.jitter = jitter
+        self.rng = np.random.default_rng(seed)
+        self.truth = []
+        self._marker = marker_center
+
+    def params_at(self, index):
+        """Frame params for frame index (advances marker_follow state, so call in order)"""
+        t = index / self.fps
+        zone = self.zone_center + self.zone_amplitude * math.sin(2 * math.pi * t / self.zone_period)
+        if self.jitter:
+            zone += self.rng.normal(0.0, self.jitter)
+        if self.marker_follow > 0:
+            self._marker += (zone - self._marker) * self.marker_follow
+            marker = self._marker
+        else:
+            marker = self.marker_center + self.marker_amplitude * math.sin(2 * math.pi * t / self.marker_period)
+        return self.params.copy(zone_middle=zone, marker_top=marker)
+
+    def frame(self, index, width=None, height=None):
+        """Render frame index and record its ground truth in self.truth"""
+        img, truth = render_frame(self.params_at(index), width, height, self.rng)
+        truth['index'] = index
+        truth['time'] = index / self.fps
+        self.truth.append(truth)
+        return img, truth
+
+    def __call__(self, index, overlay_area):
+        img, _ = self.frame(index, overlay_area['width'], overlay_area['height'])
+        return img
@@ -0,0 +1,123 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+# Fields of one per-frame trace record, in the order the engine pushes them
+FRAME_FIELDS = ('t', 'state', 'marker_y', 'zone_y', 'track_y', 'height', 'error', 'pd', 'hold')
+
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """Drops repeats of a message logged with extra={'every': seconds} more often than that.
+
+    Repeats are keyed on the logger and the unformatted message, so a per-frame
+    message with changing numbers still counts as one message. The next record
+    let through notes how many were dropped. Records without 'every' always pass.
+    """
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.last = {}
+        self.suppressed = {}
+
+    def filter(self, record):
+        every = getattr(record, 'every', None)
+        if not every:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last.get(key, -every) < every:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return False
+            self.last[key] = now
+            dropped = self.suppressed.pop(key, 0)
+        if dropped:
+            record.msg = f'{record.msg} ({dropped} similar suppressed)'
+        return True
+
+
+def setup_logging(level=logging.INFO, stream=None):
+    """Route all logging through a queue to a background writer thread.
+
+    Callers only format the record and put it on the queue; console I/O
+    happens on the listener thread. Safe to call again to change the level.
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt='%H:%M:%S'))
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class TraceWriter:
+    """Per-frame telemetry written as JSON lines on a background thread.
+
+    write() only puts a tuple of values (in fields order) on a queue; turning
+    it into JSON and writing it to path happens on the writer thread.
+    """
+    def __init__(self, path, fields=FRAME_FIELDS):
+        self.path = path
+        self.fields = fields
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.written = 0
+
+    def open(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout=5.0)
+            self.thread = None
+
+    def write(self, *values):
+        self.queue.put(values)
+
+    def _run(self):
+        with open(self.path, 'a') as f:
+            while True:
+                values = self.queue.get()
+                if values is None:
+                    break
+                f.write(json.dumps(dict(zip(self.fields, values))))
+                f.write('\n')
+                self.written += 1
+                # Flush once the backlog is written rather than per record
+                if self.queue.empty():
+                    f.flush()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,84 @@
+import numpy as np
+from capture import SyntheticFrameSource
+from confirm import ScreenConfirmer
+
+READY = (200, 40, 40)
+
+
+class FakeScreen:
+    """Every probe shows a solid color that tests switch between"""
+    def __init__(self, color=(0, 0, 0)):
+        self.color = color
+
+    def render(self, index, area):
+        img = np.zeros((area['height'], area['width'], 4), dtype=np.uint8)
+        img[:, :, 0], img[:, :, 1], img[:, :, 2] = self.color[2], self.color[1], self.color[0]
+        return img
+
+
+def confirmer(screen):
+    return ScreenConfirmer(SyntheticFrameSource(screen.render), poll=0.0)
+
+
+def counting_wait():
+    """A wait that never sleeps or aborts, counting the seconds asked for"""
+    waited = []
+    return waited, lambda seconds: waited.append(seconds) or False
+
+
+def learn(confirm, screen, step='purchase:2'):
+    """First run: the snapshot, the input changing the screen, then the full wait learning the template"""
+    screen.color = (0, 0, 0)
+    confirm.snapshot(step, (50, 50))
+    screen.color = READY
+    waited, wait = counting_wait()
+    assert confirm.wait(step, (50, 50), 0.05, wait=wait) is False
+    assert waited == [0.05]
+
+
+def test_first_run_waits_full_timeout_and_learns():
+    screen = FakeScreen()
+    confirm = confirmer(screen)
+    learn(confirm, screen)
+    assert confirm.stats()['templates'] == 1
+
+
+def test_confirms_once_the_patch_changed_and_settled():
+    screen = FakeScreen()
+    confirm = confirmer(screen)
+    learn(confirm, screen)
+    screen.color = (0, 0, 0)
+    confirm.snapshot('purchase:2', (50, 50))
+    screen.color = READY
+    _, wait = counting_wait()
+    assert confirm.wait('purchase:2', (50, 50), 1.0, wait=wait) is True
+    assert confirm.confirmed == 1
+
+
+def test_no_change_since_the_snapshot_never_confirms():
+    # The input did nothing near the point, even though it looks like last time
+    screen = FakeScreen()
+    confirm = confirmer(screen)
+    learn(confirm, screen)
+    confirm.snapshot('purchase:2', (50, 50))
+    _, wait = counting_wait()
+    assert confirm.wait('purchase:2', (50, 50), 0.05, wait=wait) is False
+    assert confirm.confirmed == 0
+    assert confirm.timeouts == 1
+
+
+def test_without_snapshot_waits_full_timeout():
+    screen = FakeScreen()
+    confirm = confirmer(screen)
+    learn(confirm, screen)
+    waited, wait = counting_wait()
+    assert confirm.wait('purchase:2', (50, 50), 0.05, wait=wait) is False
+    assert waited == [0.05]
+
+
+def test_abort_during_first_run_learns_nothing():
+    screen = FakeScreen()
+    confirm = confirmer(screen)
+    confirm.snapshot('purchase:2', (50, 50))
+    assert confirm.wait('purchase:2', (50, 50), 0.05, wait=lambda seconds: True) is False
+    assert confirm.stats()['templates'] == 0
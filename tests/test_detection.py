@@ -0,0 +1,158 @@
+import numpy as np
+import pytest
+from detection import (BLUE_COLOR, DARK_COLOR, SECTION_DTYPE, WHITE_COLOR, find_blue_bar, find_dark_sections,
+                       find_vertical_bounds, largest_section, segment_rows)
+
+# Reference implementations: the per-pixel loops the vectorized detection replaced
+
+
+def loop_blue_bar(img, color):
+    height, width = img.shape[:2]
+    for row_idx in range(height):
+        for col_idx in range(width):
+            b, g, r = img[row_idx, col_idx, 0:3]
+            if r == color[0] and g == color[1] and b == color[2]:
+                for right_idx in range(width - 1, -1, -1):
+                    b, g, r = img[row_idx, right_idx, 0:3]
+                    if r == color[0] and g == color[1] and b == color[2]:
+                        return row_idx, col_idx, right_idx
+    return None
+
+
+def loop_row_has(img, row_idx, color):
+    for col_idx in range(img.shape[1]):
+        b, g, r = img[row_idx, col_idx, 0:3]
+        if r == color[0] and g == color[1] and b == color[2]:
+            return True
+    return False
+
+
+def loop_vertical_bounds(img, color):
+    height = img.shape[0]
+    top = next((row_idx for row_idx in range(height) if loop_row_has(img, row_idx, color)), None)
+    bottom = next((row_idx for row_idx in range(height - 1, -1, -1) if loop_row_has(img, row_idx, color)), None)
+    return top, bottom
+
+
+def loop_dark_sections(img, max_gap, color):
+    height = img.shape[0]
+    sections = []
+    start = None
+    gap_counter = 0
+    for row_idx in range(height):
+        if loop_row_has(img, row_idx, color):
+            gap_counter = 0
+            if start is None:
+                start = row_idx
+        elif start is not None:
+            gap_counter += 1
+            if gap_counter > max_gap:
+                end = row_idx - gap_counter
+                sections.append({'start': start, 'end': end, 'middle': (start + end) // 2})
+                start = None
+                gap_counter = 0
+    if start is not None:
+        end = height - 1 - gap_counter
+        sections.append({'start': start, 'end': end, 'middle': (start + end) // 2})
+    for section in sections:
+        section['size'] = section['end'] - section['start'] + 1
+    return sections
+
+
+def random_frame(rng, height=40, width=12, density=0.03):
+    """BGRA noise sprinkled with sparse rows of the minigame colors"""
+    img = rng.integers(0, 256, size=(height, width, 4), dtype=np.uint8)
+    for color in (BLUE_COLOR, DARK_COLOR, WHITE_COLOR):
+        hits = rng.random((height, width)) < density
+        # Some frames get whole bands, so sections and gaps of every size show up
+        if rng.random() < 0.5:
+            top = rng.integers(0, height)
+            hits[top:top + rng.integers(1, height // 2), rng.integers(0, width)] = True
+        img[hits, 0], img[hits, 1], img[hits, 2] = color[2], color[1], color[0]
+    return img
+
+
+@pytest.fixture(scope='module')
+def frames():
+    rng = np.random.default_rng(1234)
+    return [random_frame(rng) for _ in range(200)]
+
+
+def test_blue_bar_matches_loop(frames):
+    for img in frames:
+        assert find_blue_bar(img, BLUE_COLOR) == loop_blue_bar(img, BLUE_COLOR)
+
+
+def test_blue_bar_missing():
+    img = np.zeros((10, 8, 4), dtype=np.uint8)
+    assert find_blue_bar(img) is None
+    assert loop_blue_bar(img, BLUE_COLOR) is None
+
+
+@pytest.mark.parametrize('color', [DARK_COLOR, WHITE_COLOR])
+def test_vertical_bounds_match_loop(frames, color):
+    for img in frames:
+        assert find_vertical_bounds(img, color) == loop_vertical_bounds(img, color)
+
+
+@pytest.mark.parametrize('max_gap', [0, 1, 2, 5])
+def test_dark_sections_match_loop(frames, max_gap):
+    for img in frames:
+        expected = loop_dark_sections(img, max_gap, DARK_COLOR)
+        sections = find_dark_sections(img, max_gap, DARK_COLOR)
+        assert [{key: int(s[key]) for key in ('start', 'end', 'middle', 'size')} for s in sections] == expected
+        largest = largest_section(sections)
+        if expected:
+            assert int(largest['start']) == max(expected, key=lambda s: s['size'])['start']
+        else:
+            assert largest is None
+
+
+def spans(sections):
+    return [(int(s['start']), int(s['end']), int(s['middle']), int(s['size'])) for s in sections]
+
+
+def test_segment_rows_empty_vector():
+    sections = segment_rows(np.zeros(0, dtype=bool))
+    assert sections.size == 0
+    assert sections.dtype == SECTION_DTYPE
+    assert largest_section(sections) is None
+
+
+def test_segment_rows_no_flagged_rows():
+    sections = segment_rows(np.zeros(10, dtype=bool), max_gap=3)
+    assert sections.size == 0
+    assert sections.dtype == SECTION_DTYPE
+
+
+def test_segment_rows_gap_at_max_gap_is_bridged():
+    # Rows 2-3 flagged, a gap of exactly 2 rows, then rows 6-7
+    has_row = np.array([0, 0, 1, 1, 0, 0, 1, 1, 0, 0], dtype=bool)
+    assert spans(segment_rows(has_row, max_gap=2)) == [(2, 7, 4, 6)]
+
+
+def test_segment_rows_gap_over_max_gap_splits():
+    has_row = np.array([0, 0, 1, 1, 0, 0, 1, 1, 0, 0], dtype=bool)
+    assert spans(segment_rows(has_row, max_gap=1)) == [(2, 3, 2, 2), (6, 7, 6, 2)]
+
+
+def test_segment_rows_trailing_rows_not_included():
+    has_row = np.array([1, 0, 0, 0, 0], dtype=bool)
+    assert spans(segment_rows(has_row, max_gap=10)) == [(0, 0, 0, 1)]
+
+
+def test_find_dark_sections_without_max_gap_groups_adjacent_rows_only():
+    img = np.zeros((8, 3, 4), dtype=np.uint8)
+    for row in (1, 2, 4, 7):
+        img[row, 1, 0:3] = DARK_COLOR[2], DARK_COLOR[1], DARK_COLOR[0]
+    assert spans(find_dark_sections(img)) == [(1, 2, 1, 2), (4, 4, 4, 1), (7, 7, 7, 1)]
+    assert spans(find_dark_sections(img, max_gap=None)) == spans(segment_rows(
+        np.array([0, 1, 1, 0, 1, 0, 0, 1], dtype=bool), max_gap=0))
+
+
+def test_largest_section_first_on_ties():
+    has_row = np.array([1, 1, 0, 0, 1, 1, 0, 1, 1, 1, 0, 1, 1, 1], dtype=bool)
+    sections = segment_rows(has_row)
+    assert spans(sections) == [(0, 1, 0, 2), (4, 5, 4, 2), (7, 9, 8, 3), (11, 13, 12, 3)]
+    assert int(largest_section(sections)['start']) == 7
+    assert int(largest_section(sections[:2])['start']) == 0
@@ -0,0 +1,84 @@
+import time
+import numpy as np
+import pytest
+from capture import SyntheticFrameSource
+from engine import FishingEngine, Settings
+from inputs import RecordingBackend
+from synth import MinigameScene
+
+POINTS = {1: (10, 10), 2: (20, 20), 3: (30, 30), 4: (40, 40)}
+
+
+def minigame(bite_at=5, gone_at=150):
+    """Render callable: empty water, then the minigame from bite_at until gone_at, then empty again"""
+    scene = MinigameScene(marker_follow=0.2)
+
+    def render(index, area):
+        # Roughly a live capture's cost, so a capture thread does not race through the frames
+        time.sleep(0.002)
+        if bite_at <= index < gone_at:
+            return scene(index, area)
+        return np.zeros((area['height'], area['width'], 4), dtype=np.uint8)
+    return render
+
+
+def settings(mode):
+    settings = Settings()
+    settings.tracking_fps = settings.idle_fps = 0
+    settings.wait_after_loss = 0
+    settings.auto_purchase_enabled = True
+    settings.loops_per_purchase = 1
+    settings.point_coords = dict(POINTS)
+    settings.purchase_delay_after_key = settings.purchase_click_delay = settings.purchase_after_type_delay = 0.0
+    settings.pipelined = mode == 'pipelined'
+    settings.pwm_enabled = mode == 'pwm'
+    return settings
+
+
+def buttons_down(actions):
+    """Which buttons the recorded actions leave held, failing on a press of a button already down"""
+    held = {}
+    for action, args in actions:
+        if action in ('down', 'up'):
+            down = action == 'down'
+            assert not (down and held.get(args[0])), 'button pressed twice without a release'
+            held[args[0]] = down
+    return {button for button, down in held.items() if down}
+
+
+@pytest.mark.parametrize('mode', ['direct', 'pipelined', 'pwm'])
+def test_reel_and_purchase_flow(mode):
+    backend = RecordingBackend()
+    engine = FishingEngine(settings(mode), frame_source=SyntheticFrameSource(minigame(), count=200),
+                           input_backend=backend)
+    engine.active = True
+    engine.main_loop()
+    actions = backend.actions()
+    assert engine.fish_count == 1
+    # The initial purchase and the one after the catch
+    assert actions.count(('key', ('e',))) == 2
+    assert actions.count(('text', ('10',))) == 2
+    assert engine.sequences.totals['purchase'][:2] == [2, 2]
+    first, second = [i for i, action in enumerate(actions) if action == ('key', ('e',))]
+    reel = [action for action, _ in actions[first:second] if action in ('down', 'up')]
+    # One cast (down/up) plus the reel's own presses
+    assert len(reel) > 2
+    assert buttons_down(actions) == set()
+    assert not engine.is_clicking
+    assert engine.state.entries['reeling'] == 1
+
+
+def test_stop_mid_reel_releases_the_button():
+    backend = RecordingBackend()
+    engine = FishingEngine(settings('direct'), frame_source=SyntheticFrameSource(minigame(gone_at=10 ** 6)),
+                           input_backend=backend)
+    engine.settings.auto_purchase_enabled = False
+    engine.start()
+    deadline = time.monotonic() + 5.0
+    while not engine.fish_tracked and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert engine.fish_tracked
+    engine.stop()
+    engine.thread.join(2.0)
+    assert not engine.thread.is_alive()
+    assert buttons_down(backend.actions()) == set()
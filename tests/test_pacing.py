@@ -0,0 +1,85 @@
+import threading
+import time
+import pytest
+from pacing import CancelToken, FrameScheduler
+
+
+def test_scheduler_paces_to_the_rate():
+    pacer = FrameScheduler()
+    started = time.perf_counter()
+    for _ in range(11):
+        pacer.wait(100.0)
+    assert time.perf_counter() - started == pytest.approx(0.1, abs=0.03)
+    assert pacer.measured_rate() == pytest.approx(100.0, rel=0.2)
+    assert pacer.stats()['samples'] == 10
+
+
+def test_scheduler_sleeps_only_what_is_left_of_the_period():
+    slept = []
+    pacer = FrameScheduler(sleep=slept.append)
+    pacer.wait(10.0)
+    time.sleep(0.03)
+    pacer.wait(10.0)
+    assert len(slept) == 1
+    assert slept[0] == pytest.approx(0.07, abs=0.02)
+
+
+def test_scheduler_counts_overruns_without_sleeping():
+    slept = []
+    pacer = FrameScheduler(sleep=slept.append)
+    pacer.wait(100.0)
+    time.sleep(0.02)
+    pacer.wait(100.0)
+    assert slept == []
+    assert pacer.overruns == 1
+
+
+def test_scheduler_rate_zero_never_sleeps():
+    slept = []
+    pacer = FrameScheduler(sleep=slept.append)
+    for _ in range(5):
+        pacer.wait(0)
+    assert slept == []
+    assert pacer.overruns == 0
+
+
+def test_scheduler_reset():
+    pacer = FrameScheduler(sleep=lambda seconds: None)
+    pacer.wait(0)
+    pacer.wait(0)
+    pacer.reset()
+    assert pacer.measured_rate() == 0.0
+    assert pacer.stats() == {'samples': 0, 'overruns': 0}
+
+
+def test_cancel_cuts_a_long_wait_short_within_ms():
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+    started = time.monotonic()
+    assert token.wait(30.0, 'purchase') is True
+    assert time.monotonic() - started < 0.06 + 0.02
+    stats = token.stats()['purchase']
+    assert (stats['waits'], stats['cancelled']) == (1, 1)
+    assert stats['skipped_s'] > 29.0
+
+
+def test_wait_after_cancel_returns_at_once_until_reset():
+    token = CancelToken()
+    token.cancel()
+    started = time.monotonic()
+    assert token.wait(10.0) is True
+    assert time.monotonic() - started < 0.01
+    token.reset()
+    assert token.wait(0.01) is False
+    assert token.stats()['other']['waits'] == 2
+
+
+def test_scheduler_sleeping_on_a_token_stops_on_cancel():
+    token = CancelToken()
+    pacer = FrameScheduler(sleep=lambda seconds: token.wait(seconds, 'pace'))
+    pacer.wait(0.5)
+    threading.Timer(0.02, token.cancel).start()
+    started = time.monotonic()
+    pacer.wait(0.5)
+    assert time.monotonic() - started < 0.1
+    assert token.stats()['pace']['cancelled'] == 1
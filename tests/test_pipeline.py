@@ -0,0 +1,102 @@
+import threading
+import time
+import numpy as np
+from capture import SyntheticFrameSource
+from pipeline import ControlStage, LatestQueue, PipelinedFrameSource
+
+AREA = {'x': 0, 'y': 0, 'width': 4, 'height': 4}
+
+
+def test_latest_queue_returns_newest_and_counts_drops():
+    queue = LatestQueue(maxlen=3)
+    for item in range(5):
+        queue.put(item)
+    assert queue.get_latest() == 4
+    stats = queue.stats()
+    assert (stats['dropped_full'], stats['dropped_stale'], stats['depth']) == (2, 2, 0)
+    assert queue.get_latest(timeout=0.01) is None
+
+
+def test_latest_queue_clear():
+    queue = LatestQueue()
+    queue.put(1)
+    queue.put(2)
+    queue.clear()
+    assert queue.stats()['depth'] == 0
+    assert queue.get_latest(timeout=0.01) is None
+
+
+def test_latest_queue_wakes_a_waiting_get():
+    queue = LatestQueue()
+    threading.Timer(0.05, queue.put, args=('frame',)).start()
+    started = time.monotonic()
+    assert queue.get_latest(timeout=1.0) == 'frame'
+    assert time.monotonic() - started < 0.5
+
+
+def test_control_stage_dispatches_the_newest_decision():
+    dispatched = []
+    stage = ControlStage(dispatched.append)
+    stage.start()
+    try:
+        stage.submit(True, time.perf_counter())
+        deadline = time.monotonic() + 1.0
+        while not dispatched and time.monotonic() < deadline:
+            time.sleep(0.005)
+    finally:
+        stage.stop()
+    assert dispatched == [True]
+    assert stage.stats()['dispatched'] == 1
+
+
+def test_drain_discards_pending_decisions():
+    dispatched = []
+    stage = ControlStage(dispatched.append)
+    stage.submit(True, time.perf_counter())
+    stage.drain()
+    stage.start()
+    time.sleep(0.15)
+    stage.stop()
+    assert dispatched == []
+
+
+class DrainingQueue(LatestQueue):
+    """Hands out its item as if drain() ran right after the control thread took it"""
+    def __init__(self, stage):
+        super().__init__()
+        self.stage = stage
+
+    def get_latest(self, timeout=None):
+        item = super().get_latest(timeout)
+        if item is not None:
+            self.stage.drain()
+        self.stage.running = False
+        return item
+
+
+def test_decision_taken_before_a_drain_is_not_dispatched():
+    dispatched = []
+    stage = ControlStage(dispatched.append)
+    stage.queue = DrainingQueue(stage)
+    stage.submit(True, time.perf_counter())
+    stage.running = True
+    stage._run()
+    assert dispatched == []
+    assert stage.generation == 1
+
+
+def test_pipelined_source_hands_over_frames_and_stops():
+    def render(index, area):
+        time.sleep(0.001)
+        return np.full((area['height'], area['width'], 4), index % 256, dtype=np.uint8)
+    source = PipelinedFrameSource(SyntheticFrameSource(render, count=50))
+    seen = []
+    with source:
+        while True:
+            frame = source.grab(AREA)
+            if frame is None:
+                break
+            seen.append(int(frame.img[0, 0, 0]))
+    assert seen and seen == sorted(seen)
+    assert source.stats()['captures'] == 50
+    assert source.thread is None
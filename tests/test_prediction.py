@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from prediction import AlphaBetaFilter, MotionPredictor, prediction_error
+
+
+def test_filter_starts_at_the_first_measurement():
+    f = AlphaBetaFilter()
+    assert f.predict(1.0) is None
+    assert f.update(100, 0.0) == 100.0
+    assert f.predict(1.0) == 100.0
+
+
+def test_filter_locks_onto_constant_velocity():
+    f = AlphaBetaFilter(alpha=0.5, beta=0.1)
+    for i in range(200):
+        f.update(10.0 + 50.0 * i * 0.02, i * 0.02)
+    assert f.velocity == pytest.approx(50.0, rel=1e-3)
+    now = 199 * 0.02
+    assert f.predict(now + 0.1) == pytest.approx(10.0 + 50.0 * (now + 0.1), abs=0.01)
+
+
+def test_filter_restarts_after_a_gap():
+    f = AlphaBetaFilter(max_gap=0.5)
+    for i in range(20):
+        f.update(float(i), i * 0.1)
+    assert f.velocity > 0
+    assert f.update(500.0, 1.9 + 0.6) == 500.0
+    assert f.velocity == 0.0
+
+
+def test_predictor_tracks_zone_and_marker_separately():
+    predictor = MotionPredictor()
+    for i in range(100):
+        predictor.update(200.0 + i, 300.0, i * 0.01)
+    zone, marker = predictor.predict(0.99 + 0.05)
+    assert zone == pytest.approx(200.0 + 99 + 5, abs=0.5)
+    assert marker == pytest.approx(300.0)
+    predictor.reset()
+    assert predictor.predict(1.0) == (None, None)
+
+
+def test_prediction_error_beats_holding_on_a_smooth_trajectory():
+    times = np.arange(0, 5, 1 / 60)
+    positions = 250 + 150 * np.sin(2 * np.pi * times / 3.0)
+    filter_rms, hold_rms = prediction_error(times, positions, lead=0.05)
+    assert filter_rms < hold_rms / 2
+
+
+def test_prediction_error_with_a_lead_past_the_samples():
+    assert prediction_error([0.0, 0.1], [1.0, 2.0], lead=1.0) == (0.0, 0.0)
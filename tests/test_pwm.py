@@ -0,0 +1,95 @@
+import threading
+import time
+import pytest
+from pwm import DutyCycleDriver
+
+
+class ButtonRecorder:
+    """set_button stand-in keeping (time, hold) for every change"""
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def __call__(self, hold):
+        with self.lock:
+            self.events.append((time.perf_counter(), hold))
+
+    def held_fraction(self, start, end):
+        """Share of [start, end] the button was down"""
+        with self.lock:
+            events = list(self.events)
+        held = 0.0
+        down_since = None
+        for at, hold in events:
+            at = min(max(at, start), end)
+            if hold and down_since is None:
+                down_since = at
+            elif not hold and down_since is not None:
+                held += at - down_since
+                down_since = None
+        if down_since is not None:
+            held += end - down_since
+        return held / (end - start)
+
+
+@pytest.mark.parametrize('output, duty', [(0.0, 0.5), (0.05, 0.75), (-0.05, 0.25), (0.3, 1.0), (-0.3, 0.0)])
+def test_duty_for(output, duty):
+    assert DutyCycleDriver(lambda hold: None, full_scale=0.1).duty_for(output) == pytest.approx(duty)
+
+
+@pytest.mark.parametrize('output, duty', [(0.0, 0.5), (0.05, 0.75)])
+def test_holds_for_the_duty_share_of_each_period(output, duty):
+    recorder = ButtonRecorder()
+    driver = DutyCycleDriver(recorder, frequency=20.0, full_scale=0.1)
+    driver.start()
+    try:
+        driver.set_output(output)
+        time.sleep(0.1)
+        start = time.perf_counter()
+        time.sleep(0.5)
+        end = time.perf_counter()
+    finally:
+        driver.stop()
+    assert recorder.held_fraction(start, end) == pytest.approx(duty, abs=0.12)
+    assert driver.periods >= 10
+
+
+def test_full_scale_holds_without_toggling():
+    recorder = ButtonRecorder()
+    driver = DutyCycleDriver(recorder, frequency=50.0, full_scale=0.1)
+    driver.start()
+    try:
+        driver.set_output(1.0)
+        time.sleep(0.2)
+        assert [hold for _, hold in recorder.events] == [True]
+    finally:
+        driver.stop()
+
+
+def test_stop_releases_the_button():
+    recorder = ButtonRecorder()
+    driver = DutyCycleDriver(recorder, frequency=50.0)
+    driver.start()
+    driver.set_output(1.0)
+    time.sleep(0.05)
+    driver.stop()
+    assert recorder.events[-1][1] is False
+    assert not driver.holding
+    assert driver.thread is None
+
+
+def test_pause_releases_and_idles():
+    recorder = ButtonRecorder()
+    driver = DutyCycleDriver(recorder, frequency=50.0)
+    driver.start()
+    try:
+        driver.set_output(1.0)
+        time.sleep(0.05)
+        driver.pause()
+        assert recorder.events[-1][1] is False
+        count = len(recorder.events)
+        time.sleep(0.1)
+        # Idle until the next output: nothing more is sent
+        assert len(recorder.events) == count
+    finally:
+        driver.stop()
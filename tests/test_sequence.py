@@ -0,0 +1,54 @@
+import pytest
+from engine import Settings
+from inputs import RecordingBackend
+from sequence import SequenceRunner, compile_sequence
+
+
+@pytest.fixture
+def settings():
+    settings = Settings()
+    settings.point_coords = {1: (10, 20)}
+    return settings
+
+
+@pytest.mark.parametrize('step', [
+    {'action': 'fly'},
+    {'action': 'key'},
+    {'action': 'click', 'point': 2},
+    {'action': 'wait', 'seconds': 'no_such_delay'},
+    {'action': 'wait_for_pixel', 'point': 1, 'color': [1, 2]},
+    {'action': 'wait_for_pixel', 'point': 1, 'color': 5},
+    {'action': 'wait_for_pixel', 'point': 1, 'tolerance': None},
+    'not a step',
+])
+def test_bad_steps_raise_value_error(settings, step):
+    with pytest.raises(ValueError, match='^step 2: '):
+        compile_sequence([{'action': 'key', 'key': 'e'}, step], settings)
+
+
+def test_wait_for_pixel_step(settings):
+    action, = compile_sequence([{'action': 'wait_for_pixel', 'point': 1, 'color': [1, 2, 3], 'tolerance': 4,
+                                 'timeout': 0.5}], settings)
+    assert (action.point, action.color, action.tolerance, action.seconds) == ((10, 20), (1, 2, 3), 4, 0.5)
+
+
+def test_runner_snapshots_before_inputs_that_a_pixel_wait_follows(settings):
+    steps = [
+        {'action': 'key', 'key': 'e'},
+        {'action': 'wait_for_pixel', 'point': 1, 'timeout': 0},
+        {'action': 'wait', 'seconds': 0},
+        {'action': 'wait_for_pixel', 'point': 1, 'timeout': 0},
+        {'action': 'click', 'point': 1},
+        {'action': 'type', 'text': '5'},
+        {'action': 'wait_for_pixel', 'point': 1, 'timeout': 0},
+    ]
+    backend = RecordingBackend()
+    calls = []
+
+    def before_input(step, action):
+        calls.append((step, len(backend.actions())))
+    runner = SequenceRunner(backend, lambda seconds, stage: False, lambda step, action: False, click_hold=0.0,
+                            before_input=before_input)
+    assert runner.run('purchase', compile_sequence(steps, settings))
+    # Only the key and the typing are directly followed by a pixel wait, and nothing was sent yet at the call
+    assert calls == [('purchase:2', 0), ('purchase:7', 4)]
@@ -0,0 +1,65 @@
+import pytest
+from states import (CASTING, LOST, PURCHASING, REELING, RECOVERING, STATE_POLICIES, STATES, TRANSITIONS,
+                    WAITING_FOR_BITE, FishingStateMachine)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_every_state_has_transitions_to_known_states():
+    assert set(TRANSITIONS) == set(STATES) | {None}
+    for targets in TRANSITIONS.values():
+        assert set(targets) <= set(STATES)
+
+
+@pytest.mark.parametrize('path', [
+    # Catch, loss of a tracked fish, timeout with a purchase, loss before tracking with a purchase
+    [CASTING, WAITING_FOR_BITE, REELING, LOST, CASTING],
+    [PURCHASING, CASTING, WAITING_FOR_BITE, REELING, WAITING_FOR_BITE],
+    [CASTING, WAITING_FOR_BITE, RECOVERING, PURCHASING, CASTING],
+    [CASTING, WAITING_FOR_BITE, REELING, PURCHASING, CASTING],
+])
+def test_loop_paths_are_allowed(path):
+    machine = FishingStateMachine()
+    for state in path:
+        machine.enter(state)
+    assert machine.state == path[-1]
+
+
+@pytest.mark.parametrize('path, bad', [([], REELING), ([CASTING], REELING), ([CASTING, WAITING_FOR_BITE], LOST)])
+def test_invalid_transition_raises(path, bad):
+    machine = FishingStateMachine()
+    for state in path:
+        machine.enter(state)
+    with pytest.raises(ValueError):
+        machine.enter(bad)
+
+
+def test_frame_rate_policy():
+    assert STATE_POLICIES[WAITING_FOR_BITE]['fps'] == 'idle_fps'
+    assert STATE_POLICIES[REELING]['fps'] == 'tracking_fps'
+    # Blocking states never grab frames
+    for state in (CASTING, LOST, PURCHASING, RECOVERING):
+        machine = FishingStateMachine()
+        machine.state = state
+        assert machine.policy() is None
+
+
+def test_time_and_entries_per_state():
+    clock = FakeClock()
+    machine = FishingStateMachine(clock=clock)
+    machine.enter(CASTING)
+    clock.now = 1.0
+    machine.enter(WAITING_FOR_BITE)
+    clock.now = 3.5
+    assert machine.elapsed() == 2.5
+    stats = machine.stats()
+    assert stats[CASTING] == {'seconds': 1.0, 'entries': 1}
+    # The current stay counts too
+    assert stats[WAITING_FOR_BITE] == {'seconds': 2.5, 'entries': 1}
+    assert stats[REELING] == {'seconds': 0.0, 'entries': 0}
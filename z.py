@@ -1,25 +1,27 @@
-import tkinter as tk
-from tkinter import ttk, filedialog, simpledialog
+# First, so startup times cover every import below
+from startup import STARTUP, lazy_import
+import argparse
+import importlib.util
 import threading
-import keyboard
-from pynput import keyboard as pynput_keyboard
-from pynput import mouse as pynput_mouse
-from tkinter import messagebox
 import sys
 import ctypes
-import mss
-import numpy as np
-import win32api
-import win32con
 import json
+import logging
 import os
 from datetime import datetime
 try:
-    import pystray
-    from PIL import Image, ImageDraw
-    TRAY_AVAILABLE = True
+    import tkinter as tk
+    from tkinter import ttk
 except ImportError:
-    TRAY_AVAILABLE = False
+    # Headless installs only use --no-gui
+    tk = ttk = None
+from sequence import default_sequences
+from telemetry import setup_logging, shutdown_logging
+STARTUP.mark('modules imported')
+# Checked without importing; pystray and PIL load when the tray is set up after the first paint
+TRAY_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ('pystray', 'PIL'))
+
+log = logging.getLogger(__name__)
 
 class ToolTip:
     """Simple tooltip class for hover explanations"""
@@ -119,27 +121,42 @@ class HotkeyGUI:
         self.root.rowconfigure(0, weight=1)
         self.main_loop_active = False
         self.overlay_active = False
-        self.main_loop_thread = None
         self.recording_hotkey = None
         self.overlay_window = None
         self.overlay_drag_data = {'x': 0, 'y': 0, 'resize_edge': None, 'start_width': 0, 'start_height': 0, 'start_x': 0, 'start_y': 0}
-        self.real_area = None
-        self.is_clicking = False
         self.kp = 0.1
         self.kd = 0.5
-        self.previous_error = 0
+        self.derivative_filter = 0.0
+        self.hysteresis = 0.0
+        self.predictive_tracking = False
+        self.pwm_enabled = False
+        self.pwm_frequency = 30.0
+        self.pwm_full_scale = 0.1
+        self.blue_tolerance = 0
+        self.dark_tolerance = 0
+        self.white_tolerance = 0
         self.scan_timeout = 15.0
         self.wait_after_loss = 1.0
+        self.tracking_fps = 60.0
+        self.idle_fps = 10.0
+        self.pipelined = False
         self.dpi_scale = self.get_dpi_scale()
         base_width = 172
         base_height = 495
         self.overlay_area = {'x': int(100 * self.dpi_scale), 'y': int(100 * self.dpi_scale), 'width': int(base_width * self.dpi_scale), 'height': int(base_height * self.dpi_scale)}
         self.hotkeys = {'toggle_loop': 'f1', 'toggle_overlay': 'f2', 'exit': 'f3'}
-        self.purchase_counter = 0
         self.purchase_delay_after_key = 2.0
         self.purchase_click_delay = 1.0
         self.purchase_after_type_delay = 1.0
+        self.purchase_visual_confirm = True
+        self.adaptive_purchase = False
+        # Purchase and cancel steps; edited in the preset JSON (see sequence.py)
+        self.purchase_sequence, self.cancel_sequence = default_sequences()
         self.fish_count = 0  # Track successful fishing attempts
+        # Built by finish_startup, after the first paint (importing it loads numpy)
+        self.engine = None
+        # Pending root.after id of the latency readout refresh, so there is only ever one
+        self.latency_refresh = None
         
         # UI/UX improvements
         self.dark_theme = True  # Default to dark theme
@@ -152,14 +169,22 @@ class HotkeyGUI:
             os.makedirs(self.presets_dir)
         
         self.create_widgets()
+        # Before the first paint; styling afterwards would flash the default theme
         self.apply_theme()
-        self.register_hotkeys()
         self.root.update_idletasks()
         self.root.minsize(self.root.winfo_width(), self.root.winfo_height())
-        
-        # Setup system tray if available
+        STARTUP.mark('window built')
+        self.root.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """Engine, hotkeys and tray icon, once the window is on screen"""
+        STARTUP.mark('first paint')
+        engine = lazy_import('engine')
+        self.engine = engine.FishingEngine(self, on_fish=self.increment_fish_counter)
+        self.register_hotkeys()
         if TRAY_AVAILABLE:
             self.setup_system_tray()
+        STARTUP.mark('ready')
 
     def get_dpi_scale(self):
         """Get the DPI scaling factor for the current display"""  # inserted
@@ -216,6 +241,8 @@ class HotkeyGUI:
                   style='TButton').pack(side=tk.LEFT, padx=(0, 8))
         ttk.Button(right_controls, text='📁 Load', command=self.load_preset,
                   style='TButton').pack(side=tk.LEFT, padx=(0, 8))
+        ttk.Button(right_controls, text='⏱ Latency', command=self.save_latency_report,
+                  style='TButton').pack(side=tk.LEFT, padx=(0, 8))
         
         if TRAY_AVAILABLE:
             ttk.Button(right_controls, text='📌 Tray', command=self.minimize_to_tray,
@@ -226,7 +253,7 @@ class HotkeyGUI:
         # Modern status dashboard
         status_frame = ttk.Frame(self.main_frame)
         status_frame.grid(row=current_row, column=0, sticky='ew', pady=(0, 25))
-        status_frame.columnconfigure((0, 1, 2), weight=1)
+        status_frame.columnconfigure((0, 1, 2, 3), weight=1)
         
         # Status cards
         self.loop_status = ttk.Label(status_frame, text='● Main Loop: OFF', style='StatusOff.TLabel')
@@ -238,6 +265,10 @@ class HotkeyGUI:
         self.fish_counter_label = ttk.Label(status_frame, text='🐟 Fish: 0', style='Counter.TLabel')
         self.fish_counter_label.grid(row=0, column=2, padx=10, pady=8)
         
+        self.latency_label = ttk.Label(status_frame, text='⏱ Latency: --', style='Counter.TLabel')
+        self.latency_label.grid(row=0, column=3, padx=10, pady=8)
+        ToolTip(self.latency_label, 'Capture-to-input latency p50 / p95 of the PD hold/release decision')
+        
         current_row += 1
         
         # Create modern collapsible sections
@@ -247,6 +278,9 @@ class HotkeyGUI:
         self.create_pd_controller_section(current_row)
         current_row += 1
         
+        self.create_detection_section(current_row)
+        current_row += 1
+        
         self.create_timing_section(current_row)
         current_row += 1
         
@@ -273,7 +307,7 @@ class HotkeyGUI:
                         pass
                     return False  # Stop listener after first click
             
-            listener = pynput_mouse.Listener(on_click=_on_click)
+            listener = lazy_import('pynput.mouse').Listener(on_click=_on_click)
             listener.start()
         except Exception as e:
             try:
@@ -287,153 +321,6 @@ class HotkeyGUI:
             self.point_buttons[idx].config(text=f'Point {idx}: {coords}')
         return None
 
-    def _click_at(self, coords):
-        """Move cursor to coords and perform a left click."""  # inserted
-        try:
-            x, y = (int(coords[0]), int(coords[1]))
-            win32api.SetCursorPos((x, y))
-            try:
-                win32api.mouse_event(win32con.MOUSEEVENTF_MOVE, 0, 1, 0, 0)
-                threading.Event().wait(0.05)
-                win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
-                threading.Event().wait(0.05)
-                win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
-            except Exception:
-                pass
-        except Exception as e:
-            print(f'Error clicking at {coords}: {e}')
-
-    def _right_click_at(self, coords):
-        """Move cursor to coords and perform a right click."""  # inserted
-        try:
-            x, y = (int(coords[0]), int(coords[1]))
-            win32api.SetCursorPos((x, y))
-            try:
-                win32api.mouse_event(win32con.MOUSEEVENTF_MOVE, 0, 1, 0, 0)
-                threading.Event().wait(0.05)
-                win32api.mouse_event(win32con.MOUSEEVENTF_RIGHTDOWN, 0, 0, 0, 0)
-                threading.Event().wait(0.05)
-                win32api.mouse_event(win32con.MOUSEEVENTF_RIGHTUP, 0, 0, 0, 0)
-            except Exception:
-                pass
-        except Exception as e:
-            print(f'Error right-clicking at {coords}: {e}')
-
-    def perform_auto_purchase_sequence(self):
-        print('=== AUTO-PURCHASE SEQUENCE START ===')
-        pts = self.point_coords
-        if not pts or not pts.get(1) or not pts.get(2) or not pts.get(3) or not pts.get(4):
-            print('Auto purchase aborted: points not fully set (need points 1-4).')
-            return
-        
-        # Check if main loop is still active before starting
-        if not self.main_loop_active:
-            print('Auto purchase aborted: main loop stopped.')
-            return
-        
-        amount = str(self.auto_purchase_amount)
-        
-        # Press 'e' key
-        print('Pressing E key...')
-        keyboard.press_and_release('e')
-        threading.Event().wait(self.purchase_delay_after_key)
-        
-        if not self.main_loop_active:
-            return
-        
-        # Click point 1
-        print(f'Clicking Point 1: {pts[1]}')
-        self._click_at(pts[1])
-        threading.Event().wait(self.purchase_click_delay)
-        
-        if not self.main_loop_active:
-            return
-        
-        # Click point 2
-        print(f'Clicking Point 2: {pts[2]}')
-        self._click_at(pts[2])
-        threading.Event().wait(self.purchase_click_delay)
-        
-        if not self.main_loop_active:
-            return
-        
-        # Type amount
-        print(f'Typing amount: {amount}')
-        keyboard.write(amount)
-        threading.Event().wait(self.purchase_after_type_delay)
-        
-        if not self.main_loop_active:
-            return
-        
-        # Click point 1 again
-        print(f'Clicking Point 1: {pts[1]}')
-        self._click_at(pts[1])
-        threading.Event().wait(self.purchase_click_delay)
-        
-        if not self.main_loop_active:
-            return
-        
-        # Click point 3
-        print(f'Clicking Point 3: {pts[3]}')
-        self._click_at(pts[3])
-        threading.Event().wait(self.purchase_click_delay)
-        
-        if not self.main_loop_active:
-            return
-
-        # Click point 2
-        print(f'Clicking Point 2: {pts[2]}')
-        self._click_at(pts[2])
-        threading.Event().wait(self.purchase_click_delay)
-        
-        if not self.main_loop_active:
-            return
-        
-        # Right-click point 5 to fish at
-        print(f'Right-clicking Point 4: {pts[4]}')
-        self._right_click_at(pts[4])
-        threading.Event().wait(self.purchase_click_delay)
-        
-        print('=== AUTO-PURCHASE SEQUENCE COMPLETE ===')
-        print()
-
-    def perform_purchase_cancel(self):
-        print('=== PURCHASE CANCELLATION SEQUENCE START ===')
-        pts = self.point_coords
-        if not pts or not pts.get(4) or not pts.get(2):
-            print('Auto purchase aborted: points not fully set (need points 4&2).')
-            return
-        
-        # Check if main loop is still active before starting
-        if not self.main_loop_active:
-            print('Auto purchase aborted: main loop stopped.')
-            return
-        
-        # Click point 4 | cancel order
-        print(f'Clicking Point 3: {pts[3]}')
-        self._click_at(pts[3])
-        threading.Event().wait(self.purchase_click_delay)
-        
-        if not self.main_loop_active:
-            return
-
-        # Click point 2 | cancel menu
-        print(f'Clicking Point 2: {pts[2]}')
-        self._click_at(pts[2])
-        threading.Event().wait(self.purchase_click_delay)
-        
-        if not self.main_loop_active:
-            return
-        
-        # Right-click point 5 to fish at | repo mouse
-        print(f'Right-clicking Point 4: {pts[4]}')
-        self._right_click_at(pts[4])
-        threading.Event().wait(self.purchase_click_delay)
-        
-        print('=== AUTO-PURCHASE SEQUENCE COMPLETE ===')
-        print()
-    
-
     def start_rebind(self, action):
         """Start recording a new hotkey"""  # inserted
         self.recording_hotkey = action
@@ -441,7 +328,7 @@ class HotkeyGUI:
         self.loop_rebind_btn.config(state='disabled')
         self.overlay_rebind_btn.config(state='disabled')
         self.exit_rebind_btn.config(state='disabled')
-        listener = pynput_keyboard.Listener(on_press=self.on_key_press)
+        listener = lazy_import('pynput.keyboard').Listener(on_press=self.on_key_press)
         listener.start()
 
     def on_key_press(self, key):
@@ -484,15 +371,19 @@ class HotkeyGUI:
     def register_hotkeys(self):
         """Register all hotkeys"""  # inserted
         try:
+            keyboard = lazy_import('keyboard')
             keyboard.unhook_all()
             keyboard.add_hotkey(self.hotkeys['toggle_loop'], self.toggle_main_loop)
             keyboard.add_hotkey(self.hotkeys['toggle_overlay'], self.toggle_overlay)
             keyboard.add_hotkey(self.hotkeys['exit'], self.exit_app)
         except Exception as e:
-            print(f'Error registering hotkeys: {e}')
+            log.error('Error registering hotkeys: %s', e)
 
     def toggle_main_loop(self):
         """Toggle the main loop on/off"""
+        if self.engine is None:
+            # Still starting up
+            return
         new_state = not self.main_loop_active
         
         if new_state:
@@ -501,7 +392,7 @@ class HotkeyGUI:
                 pts = getattr(self, 'point_coords', {})
                 missing = [i for i in [1, 2, 3, 4] if not pts.get(i)]
                 if missing:
-                    messagebox.showwarning('Auto Purchase: Points missing', f'Please set Point(s) {missing} before starting Auto Purchase.')
+                    lazy_import('tkinter.messagebox').showwarning('Auto Purchase: Points missing', f'Please set Point(s) {missing} before starting Auto Purchase.')
                     return
         
         # Apply new state
@@ -510,16 +401,13 @@ class HotkeyGUI:
         if self.main_loop_active:
             self.loop_status.config(text='● Main Loop: ACTIVE', style='StatusOn.TLabel')
             self.reset_fish_counter()  # Reset counter when starting
-            self.main_loop_thread = threading.Thread(target=self.main_loop, daemon=True)
-            self.main_loop_thread.start()
+            self.engine.start()
+            self.schedule_latency_refresh()
         else:
             self.loop_status.config(text='● Main Loop: OFF', style='StatusOff.TLabel')
-            # Release mouse button if it's being held when stopping
-            if self.is_clicking:
-                win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
-                self.is_clicking = False
-            # Reset PD controller state
-            self.previous_error = 0
+            # Release mouse button and reset PD state
+            self.engine.stop()
+            self.cancel_latency_refresh()
 
     def increment_fish_counter(self):
         """Increment fish counter and update display"""
@@ -528,7 +416,52 @@ class HotkeyGUI:
             self.root.after(0, lambda: self.fish_counter_label.config(text=f'🐟 Fish: {self.fish_count}'))
         except Exception:
             pass
-        print(f'Fish caught: {self.fish_count}')
+        log.info('Fish caught: %d', self.fish_count)
+
+    def schedule_latency_refresh(self):
+        """Refresh the latency readout in half a second, replacing any refresh already pending"""
+        self.cancel_latency_refresh()
+        self.latency_refresh = self.root.after(500, self.update_latency_label)
+
+    def cancel_latency_refresh(self):
+        if self.latency_refresh is not None:
+            self.root.after_cancel(self.latency_refresh)
+            self.latency_refresh = None
+
+    def update_latency_label(self):
+        """Refresh the latency readout every half second while the loop runs"""
+        self.latency_refresh = None
+        total = self.engine.latency.histograms['total'].summary()
+        if total['count']:
+            self.latency_label.config(text=f"⏱ {total['p50_ms']:.0f} / {total['p95_ms']:.0f} ms")
+        if self.main_loop_active:
+            self.schedule_latency_refresh()
+
+    def save_latency_report(self):
+        """Dump the per-stage latency histograms to a JSON file"""
+        path = lazy_import('tkinter.filedialog').asksaveasfilename(title='Save Latency Report', defaultextension='.json',
+                                            initialfile=f"latency_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                                            filetypes=[('JSON files', '*.json'), ('All files', '*.*')])
+        if not path:
+            return
+        try:
+            self.engine.latency.dump(path)
+            self.status_msg.config(text=f'Latency report saved: {os.path.basename(path)}', foreground='green')
+        except Exception as e:
+            self.status_msg.config(text=f'Error saving latency report: {e}', foreground='red')
+
+    def save_purchase_log(self):
+        """Dump the purchase scheduler's stats and decision log to a JSON file"""
+        path = lazy_import('tkinter.filedialog').asksaveasfilename(title='Save Purchase Decisions', defaultextension='.json',
+                                            initialfile=f"purchases_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                                            filetypes=[('JSON files', '*.json'), ('All files', '*.*')])
+        if not path:
+            return
+        try:
+            self.engine.scheduler.dump(path)
+            self.status_msg.config(text=f'Purchase log saved: {os.path.basename(path)}', foreground='green')
+        except Exception as e:
+            self.status_msg.config(text=f'Error saving purchase log: {e}', foreground='red')
 
     def reset_fish_counter(self):
         """Reset fish counter when main loop starts"""
@@ -538,242 +471,20 @@ class HotkeyGUI:
         except Exception:
             pass
 
-    def check_and_purchase(self):
-        """Check if we need to auto-purchase and run sequence if needed"""  # inserted
-        if getattr(self, 'auto_purchase_var', None) and self.auto_purchase_var.get():
-            self.purchase_counter += 1
-            loops_needed = int(getattr(self, 'loops_per_purchase', 1)) if getattr(self, 'loops_per_purchase', None) is not None else 1
-            print(f'Purchase counter: {self.purchase_counter}/{loops_needed}')
-            if self.purchase_counter >= max(1, loops_needed):
-                print('Triggering auto-purchase sequence...')
-                try:
-                    self.perform_auto_purchase_sequence()
-                    self.purchase_counter = 0
-                except Exception as e:
-                    print(f'Error during auto-purchase: {e}')
-
-    def cast_line(self):
-        """Perform the casting action: hold click for 1 second then release"""  # inserted
-        print('Casting line...')
-        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
-        threading.Event().wait(1.0)
-        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
-        self.is_clicking = False
-        print('Line cast')
-
-    def main_loop(self):
-        """Main loop that runs when activated"""
-        print('Main loop started')
-        target_color = (85, 170, 255)
-        dark_color = (25, 25, 25)
-        white_color = (255, 255, 255)
-        import time
-        
-        with mss.mss() as sct:
-            if getattr(self, 'auto_purchase_var', None) and self.auto_purchase_var.get():
-                print('Running initial auto-purchase...')
-                self.perform_auto_purchase_sequence()
-            self.cast_line()
-            cast_time = time.time()
-            detected = False
-            last_detection_time = time.time()
-            was_detecting = False
-            print('Entering main detection loop...')
-            
-            while self.main_loop_active:
-                x = self.overlay_area['x']
-                y = self.overlay_area['y']
-                width = self.overlay_area['width']
-                height = self.overlay_area['height']
-                monitor = {'left': x, 'top': y, 'width': width, 'height': height}
-                screenshot = sct.grab(monitor)
-                img = np.array(screenshot)
-                point1_x = None
-                point1_y = None
-                found_first = False
-                for row_idx in range(height):
-                    for col_idx in range(width):
-                        b, g, r = img[row_idx, col_idx, 0:3]
-                        if r == target_color[0] and g == target_color[1] and b == target_color[2]:
-                            point1_x = x + col_idx
-                            point1_y = y + row_idx
-                            found_first = True
-                            break
-                    if found_first:
-                        break
-                current_time = time.time()
-                
-                if found_first:
-                    detected = True
-                    last_detection_time = current_time
-                else:
-                    # No blue bar found - check if we should timeout
-                    if not detected and current_time - cast_time > self.scan_timeout:
-                        print(f'Cast timeout after {self.scan_timeout}s, recasting...')
-                        self.perform_purchase_cancel()
-                        self.cast_line()
-                        cast_time = time.time()
-                        detected = False
-                        threading.Event().wait(0.1)
-                        continue
-                    
-                    # If we were previously detecting but now lost it
-                    if was_detecting:
-                        print('Lost detection, waiting...')
-                        threading.Event().wait(self.wait_after_loss)
-                        was_detecting = False
-                        self.check_and_purchase()
-                        self.cast_line()
-                        detected = False
-                        cast_time = time.time()
-                        last_detection_time = time.time()
-                    
-                    threading.Event().wait(0.1)
-                    continue
-                point2_x = None
-                row_idx = point1_y - y
-                for col_idx in range(width - 1, -1, -1):
-                    b, g, r = img[row_idx, col_idx, 0:3]
-                    if r == target_color[0] and g == target_color[1] and b == target_color[2]:
-                        point2_x = x + col_idx
-                        break
-                if point2_x is None:
-                    threading.Event().wait(0.1)
-                    continue
-                temp_area_x = point1_x
-                temp_area_width = point2_x - point1_x + 1
-                temp_monitor = {'left': temp_area_x, 'top': y, 'width': temp_area_width, 'height': height}
-                temp_screenshot = sct.grab(temp_monitor)
-                temp_img = np.array(temp_screenshot)
-                dark_color = (25, 25, 25)
-                top_y = None
-                for row_idx in range(height):
-                    found_dark = False
-                    for col_idx in range(temp_area_width):
-                        b, g, r = temp_img[row_idx, col_idx, 0:3]
-                        if r == dark_color[0] and g == dark_color[1] and b == dark_color[2]:
-                            top_y = y + row_idx
-                            found_dark = True
-                            break
-                    if found_dark:
-                        break
-                bottom_y = None
-                for row_idx in range(height - 1, -1, -1):
-                    found_dark = False
-                    for col_idx in range(temp_area_width):
-                        b, g, r = temp_img[row_idx, col_idx, 0:3]
-                        if r == dark_color[0] and g == dark_color[1] and b == dark_color[2]:
-                            bottom_y = y + row_idx
-                            found_dark = True
-                            break
-                    if found_dark:
-                        break
-                if top_y is None or bottom_y is None:
-                    threading.Event().wait(0.1)
-                    continue
-                self.real_area = {'x': temp_area_x, 'y': top_y, 'width': temp_area_width, 'height': bottom_y - top_y + 1}
-                real_x = self.real_area['x']
-                real_y = self.real_area['y']
-                real_width = self.real_area['width']
-                real_height = self.real_area['height']
-                real_monitor = {'left': real_x, 'top': real_y, 'width': real_width, 'height': real_height}
-                real_screenshot = sct.grab(real_monitor)
-                real_img = np.array(real_screenshot)
-                white_color = (255, 255, 255)
-                white_top_y = None
-                white_bottom_y = None
-                for row_idx in range(real_height):
-                    for col_idx in range(real_width):
-                        b, g, r = real_img[row_idx, col_idx, 0:3]
-                        if r == white_color[0] and g == white_color[1] and b == white_color[2]:
-                            white_top_y = real_y + row_idx
-                            break
-                    if white_top_y is not None:
-                        break
-                for row_idx in range(real_height - 1, -1, -1):
-                    for col_idx in range(real_width):
-                        b, g, r = real_img[row_idx, col_idx, 0:3]
-                        if r == white_color[0] and g == white_color[1] and b == white_color[2]:
-                            white_bottom_y = real_y + row_idx
-                            break
-                    if white_bottom_y is not None:
-                        break
-                if white_top_y is not None and white_bottom_y is not None:
-                    white_height = white_bottom_y - white_top_y + 1
-                    max_gap = white_height * 2
-                dark_sections = []
-                current_section_start = None
-                gap_counter = 0
-                for row_idx in range(real_height):
-                    has_dark = False
-                    for col_idx in range(real_width):
-                        b, g, r = real_img[row_idx, col_idx, 0:3]
-                        if r == dark_color[0] and g == dark_color[1] and b == dark_color[2]:
-                            has_dark = True
-                            break
-                    if has_dark:
-                        gap_counter = 0
-                        if current_section_start is None:
-                            current_section_start = real_y + row_idx
-                    else:
-                        if current_section_start is not None:
-                            gap_counter += 1
-                            if gap_counter > max_gap:
-                                section_end = real_y + row_idx - gap_counter
-                                dark_sections.append({'start': current_section_start, 'end': section_end, 'middle': (current_section_start + section_end) // 2})
-                                current_section_start = None
-                                gap_counter = 0
-                if current_section_start is not None:
-                    section_end = real_y + real_height - 1 - gap_counter
-                    dark_sections.append({'start': current_section_start, 'end': section_end, 'middle': (current_section_start + section_end) // 2})
-                if dark_sections and white_top_y is not None:
-                    # If this is the first time detecting this fish, increment counter
-                    if not was_detecting:
-                        self.increment_fish_counter()
-                    was_detecting = True
-                    last_detection_time = time.time()
-                    for section in dark_sections:
-                        section['size'] = section['end'] - section['start'] + 1
-                    largest_section = max(dark_sections, key=lambda s: s['size'])
-                    print(f'y:{white_top_y}')
-                    print(f"y:{largest_section['middle']}")
-                    raw_error = largest_section['middle'] - white_top_y
-                    normalized_error = raw_error / real_height if real_height > 0 else raw_error
-                    derivative = normalized_error - self.previous_error
-                    self.previous_error = normalized_error
-                    pd_output = self.kp * normalized_error + self.kd * derivative
-                    print(f'Error: {raw_error}px ({normalized_error:.3f} normalized), PD Output: {pd_output:.2f}')
-                    
-                    # Decide whether to hold or release based on PD output
-                    # Positive error/output = middle is below, need to go up = hold click
-                    # Negative error/output = middle is above, need to go down = release click
-                    if pd_output > 0:
-                        # Need to accelerate up - hold left click
-                        if not self.is_clicking:
-                            win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
-                            self.is_clicking = True
-                    else:
-                        # Need to accelerate down - release left click
-                        if self.is_clicking:
-                            win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
-                            self.is_clicking = False
-                    
-                    print()
-                threading.Event().wait(0.1)
-        print('Main loop stopped')
-
-
     def toggle_overlay(self):
         """Toggle the overlay on/off"""
         self.overlay_active = not self.overlay_active
         if self.overlay_active:
             self.overlay_status.config(text='● Overlay: ACTIVE', style='StatusOn.TLabel')
             self.create_overlay()
-            print(f'Overlay activated at: {self.overlay_area}')
+            log.info('Overlay activated at: %s', self.overlay_area)
         else:
             self.overlay_status.config(text='● Overlay: OFF', style='StatusOff.TLabel')
             self.destroy_overlay()
-            print(f'Overlay deactivated. Saved area: {self.overlay_area}')
+            log.info('Overlay deactivated. Saved area: %s', self.overlay_area)
+            # The area may have moved while the loop was running
+            if self.engine is not None:
+                self.engine.overlay_changed()
 
     def create_overlay(self):
         """Create a draggable, resizable overlay window"""
@@ -916,8 +627,10 @@ class HotkeyGUI:
 
     def exit_app(self):
         """Exit the application"""
-        print('Exiting application...')
+        log.info('Exiting application')
         self.main_loop_active = False
+        if self.engine is not None:
+            self.engine.stop()
 
         # Stop system tray if running
         if self.tray_icon:
@@ -936,7 +649,8 @@ class HotkeyGUI:
 
         # Unhook all keyboard events
         try:
-            keyboard.unhook_all()
+            if 'keyboard' in sys.modules:
+                sys.modules['keyboard'].unhook_all()
         except Exception:
             pass
 
@@ -946,6 +660,9 @@ class HotkeyGUI:
         except Exception:
             pass
 
+        # Flush queued log records before exiting
+        shutdown_logging()
+
         # Exit the program
         sys.exit(0)
 
@@ -961,6 +678,8 @@ class HotkeyGUI:
         self.auto_purchase_var = tk.BooleanVar(value=False)
         auto_check = ttk.Checkbutton(frame, variable=self.auto_purchase_var, text='Enabled')
         auto_check.grid(row=row, column=1, pady=5, sticky=tk.W)
+        self.auto_purchase_var.trace_add('write', lambda *args: setattr(self, 'auto_purchase_enabled', self.auto_purchase_var.get()))
+        self.auto_purchase_enabled = self.auto_purchase_var.get()
         help_btn = ttk.Button(frame, text='?', width=3)
         help_btn.grid(row=row, column=3, padx=5, pady=5)
         ToolTip(help_btn, "Automatically buy bait after catching fish. Requires setting Points 1-4.")
@@ -990,6 +709,33 @@ class HotkeyGUI:
         self.loops_per_purchase = self.loops_var.get()
         row += 1
         
+        ttk.Label(frame, text='Adaptive Schedule:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.adaptive_purchase_var = tk.BooleanVar(value=self.adaptive_purchase)
+        adaptive_check = ttk.Checkbutton(frame, variable=self.adaptive_purchase_var, text='Enabled')
+        adaptive_check.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Ignore Loops per Purchase and buy when the bait bought is estimated to be used up: one bait per bite, corrected whenever casts stop getting bites. Buys the full Amount each time")
+        self.adaptive_purchase_var.trace_add('write', lambda *args: setattr(self, 'adaptive_purchase', self.adaptive_purchase_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='Decision Log:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        ttk.Button(frame, text='Save', command=self.save_purchase_log).grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Save catches, timeouts, purchases and every buy/wait decision of the current run to a JSON file")
+        row += 1
+        
+        ttk.Label(frame, text='Confirm Steps On Screen:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.visual_confirm_var = tk.BooleanVar(value=self.purchase_visual_confirm)
+        visual_confirm_check = ttk.Checkbutton(frame, variable=self.visual_confirm_var, text='Enabled')
+        visual_confirm_check.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Move to the next purchase step as soon as the screen near the next point has changed and settled the way it did last time, instead of always waiting the full delay. Steps that change nothing near their point still wait the full delay. The first purchase learns what to look for")
+        self.visual_confirm_var.trace_add('write', lambda *args: setattr(self, 'purchase_visual_confirm', self.visual_confirm_var.get()))
+        row += 1
+        
         # Point buttons for auto-purchase
         self.point_buttons = {}
         self.point_coords = {1: None, 2: None, 3: None, 4: None}
@@ -1039,6 +785,106 @@ class HotkeyGUI:
         help_btn.grid(row=row, column=3, padx=5, pady=5)
         ToolTip(help_btn, "Smooths movement to prevent overshooting. Higher = smoother but slower")
         self.kd_var.trace_add('write', lambda *args: setattr(self, 'kd', self.kd_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='Derivative Smoothing (s):').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.derivative_filter_var = tk.DoubleVar(value=self.derivative_filter)
+        filter_spinbox = ttk.Spinbox(frame, from_=0.0, to=0.5, increment=0.01, textvariable=self.derivative_filter_var, width=10)
+        filter_spinbox.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Averages the derivative over this long to ignore detection jitter. 0 = off")
+        self.derivative_filter_var.trace_add('write', lambda *args: setattr(self, 'derivative_filter', self.derivative_filter_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='Hysteresis:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.hysteresis_var = tk.DoubleVar(value=self.hysteresis)
+        hysteresis_spinbox = ttk.Spinbox(frame, from_=0.0, to=0.2, increment=0.005, textvariable=self.hysteresis_var, width=10)
+        hysteresis_spinbox.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Dead band around zero the PD output must cross before the click flips. Reduces rapid clicking. 0 = off")
+        self.hysteresis_var.trace_add('write', lambda *args: setattr(self, 'hysteresis', self.hysteresis_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='Predictive Tracking:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.predictive_var = tk.BooleanVar(value=self.predictive_tracking)
+        predictive_check = ttk.Checkbutton(frame, variable=self.predictive_var, text='Enabled')
+        predictive_check.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Smooth the zone and marker positions and aim where they will be when the click lands, making up for capture delay")
+        self.predictive_var.trace_add('write', lambda *args: setattr(self, 'predictive_tracking', self.predictive_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='Duty-Cycle Clicking:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.pwm_var = tk.BooleanVar(value=self.pwm_enabled)
+        pwm_check = ttk.Checkbutton(frame, variable=self.pwm_var, text='Enabled')
+        pwm_check.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Pulse the click at a fixed rate, holding longer the stronger the PD output, instead of just holding or releasing (applies on next start)")
+        self.pwm_var.trace_add('write', lambda *args: setattr(self, 'pwm_enabled', self.pwm_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='Pulse Rate (Hz):').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.pwm_frequency_var = tk.DoubleVar(value=self.pwm_frequency)
+        pwm_frequency_spinbox = ttk.Spinbox(frame, from_=5.0, to=120.0, increment=5.0, textvariable=self.pwm_frequency_var, width=10)
+        pwm_frequency_spinbox.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "How many hold/release pulses per second in duty-cycle mode")
+        self.pwm_frequency_var.trace_add('write', lambda *args: setattr(self, 'pwm_frequency', self.pwm_frequency_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='Full Hold At:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.pwm_full_scale_var = tk.DoubleVar(value=self.pwm_full_scale)
+        pwm_full_scale_spinbox = ttk.Spinbox(frame, from_=0.01, to=1.0, increment=0.01, textvariable=self.pwm_full_scale_var, width=10)
+        pwm_full_scale_spinbox.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "PD output that means holding the whole time in duty-cycle mode. Lower = pulses saturate sooner")
+        self.pwm_full_scale_var.trace_add('write', lambda *args: setattr(self, 'pwm_full_scale', self.pwm_full_scale_var.get()))
+
+    def create_detection_section(self, start_row):
+        """Create the color detection collapsible section"""
+        section = CollapsibleFrame(self.main_frame, "🎯 Color Detection", start_row)
+        # Start collapsed by default
+        section.is_expanded = False
+        section.content_frame.pack_forget()
+        section.toggle_btn.config(text='+')
+        self.collapsible_sections['detection'] = section
+        frame = section.get_content_frame()
+        
+        row = 0
+        ttk.Label(frame, text='Blue Tolerance:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.blue_tolerance_var = tk.IntVar(value=self.blue_tolerance)
+        blue_spinbox = ttk.Spinbox(frame, from_=0, to=64, increment=1, textvariable=self.blue_tolerance_var, width=10)
+        blue_spinbox.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "How far each color channel may be off and still count as the blue bar. Raise if gamma/HDR shifts colors")
+        self.blue_tolerance_var.trace_add('write', lambda *args: setattr(self, 'blue_tolerance', self.blue_tolerance_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='Dark Tolerance:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.dark_tolerance_var = tk.IntVar(value=self.dark_tolerance)
+        dark_spinbox = ttk.Spinbox(frame, from_=0, to=64, increment=1, textvariable=self.dark_tolerance_var, width=10)
+        dark_spinbox.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Per-channel tolerance for the dark track and fish zone")
+        self.dark_tolerance_var.trace_add('write', lambda *args: setattr(self, 'dark_tolerance', self.dark_tolerance_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='White Tolerance:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.white_tolerance_var = tk.IntVar(value=self.white_tolerance)
+        white_spinbox = ttk.Spinbox(frame, from_=0, to=64, increment=1, textvariable=self.white_tolerance_var, width=10)
+        white_spinbox.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Per-channel tolerance for the white marker")
+        self.white_tolerance_var.trace_add('write', lambda *args: setattr(self, 'white_tolerance', self.white_tolerance_var.get()))
 
     def create_timing_section(self, start_row):
         """Create the timing settings collapsible section"""
@@ -1069,6 +915,36 @@ class HotkeyGUI:
         help_btn.grid(row=row, column=3, padx=5, pady=5)
         ToolTip(help_btn, "Pause time after losing a fish before recasting (seconds)")
         self.wait_var.trace_add('write', lambda *args: setattr(self, 'wait_after_loss', self.wait_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='Tracking FPS:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.tracking_fps_var = tk.DoubleVar(value=self.tracking_fps)
+        tracking_spinbox = ttk.Spinbox(frame, from_=0.0, to=240.0, increment=5.0, textvariable=self.tracking_fps_var, width=10)
+        tracking_spinbox.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Target detection rate while reeling a fish (0 = as fast as possible)")
+        self.tracking_fps_var.trace_add('write', lambda *args: setattr(self, 'tracking_fps', self.tracking_fps_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='Idle FPS:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.idle_fps_var = tk.DoubleVar(value=self.idle_fps)
+        idle_spinbox = ttk.Spinbox(frame, from_=1.0, to=60.0, increment=1.0, textvariable=self.idle_fps_var, width=10)
+        idle_spinbox.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Polling rate while waiting for a bite")
+        self.idle_fps_var.trace_add('write', lambda *args: setattr(self, 'idle_fps', self.idle_fps_var.get()))
+        row += 1
+        
+        ttk.Label(frame, text='Pipelined Capture:').grid(row=row, column=0, sticky=tk.W, pady=5)
+        self.pipelined_var = tk.BooleanVar(value=self.pipelined)
+        pipelined_check = ttk.Checkbutton(frame, variable=self.pipelined_var, text='Enabled')
+        pipelined_check.grid(row=row, column=1, pady=5, sticky=tk.W)
+        help_btn = ttk.Button(frame, text='?', width=3)
+        help_btn.grid(row=row, column=3, padx=5, pady=5)
+        ToolTip(help_btn, "Capture, detect and click on separate threads so a slow screen grab never delays a click (applies on next start)")
+        self.pipelined_var.trace_add('write', lambda *args: setattr(self, 'pipelined', self.pipelined_var.get()))
 
     def create_hotkeys_section(self, start_row):
         """Create the hotkey bindings collapsible section"""
@@ -1298,7 +1174,7 @@ class HotkeyGUI:
 
     def save_preset(self):
         """Save current settings as a preset"""
-        preset_name = simpledialog.askstring("Save Preset", "Enter preset name:")
+        preset_name = lazy_import('tkinter.simpledialog').askstring("Save Preset", "Enter preset name:")
         if not preset_name:
             return
             
@@ -1306,11 +1182,27 @@ class HotkeyGUI:
             'auto_purchase_enabled': self.auto_purchase_var.get(),
             'auto_purchase_amount': self.amount_var.get(),
             'loops_per_purchase': self.loops_var.get(),
+            'purchase_visual_confirm': self.visual_confirm_var.get(),
+            'adaptive_purchase': self.adaptive_purchase_var.get(),
             'point_coords': self.point_coords,
+            'purchase_sequence': self.purchase_sequence,
+            'cancel_sequence': self.cancel_sequence,
             'kp': self.kp_var.get(),
             'kd': self.kd_var.get(),
+            'derivative_filter': self.derivative_filter_var.get(),
+            'hysteresis': self.hysteresis_var.get(),
+            'predictive_tracking': self.predictive_var.get(),
+            'pwm_enabled': self.pwm_var.get(),
+            'pwm_frequency': self.pwm_frequency_var.get(),
+            'pwm_full_scale': self.pwm_full_scale_var.get(),
+            'blue_tolerance': self.blue_tolerance_var.get(),
+            'dark_tolerance': self.dark_tolerance_var.get(),
+            'white_tolerance': self.white_tolerance_var.get(),
             'scan_timeout': self.timeout_var.get(),
             'wait_after_loss': self.wait_var.get(),
+            'tracking_fps': self.tracking_fps_var.get(),
+            'idle_fps': self.idle_fps_var.get(),
+            'pipelined': self.pipelined_var.get(),
             'hotkeys': self.hotkeys.copy(),
             'overlay_area': self.overlay_area.copy(),
             'dark_theme': self.dark_theme,
@@ -1327,7 +1219,7 @@ class HotkeyGUI:
 
     def load_preset(self):
         """Load a preset configuration"""
-        preset_file = filedialog.askopenfilename(
+        preset_file = lazy_import('tkinter.filedialog').askopenfilename(
             title="Load Preset",
             initialdir=self.presets_dir,
             filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
@@ -1344,6 +1236,8 @@ class HotkeyGUI:
             self.auto_purchase_var.set(preset_data.get('auto_purchase_enabled', True))
             self.amount_var.set(preset_data.get('auto_purchase_amount', 10))
             self.loops_var.set(preset_data.get('loops_per_purchase', 10))
+            self.visual_confirm_var.set(preset_data.get('purchase_visual_confirm', True))
+            self.adaptive_purchase_var.set(preset_data.get('adaptive_purchase', False))
             raw_points = preset_data.get('point_coords', { "1": None, "2": None, "3": None, "4": None })
             self.point_coords = {}
             for k, v in raw_points.items():
@@ -1352,11 +1246,26 @@ class HotkeyGUI:
                 except Exception:
                     continue
                 self.point_coords[ik] = tuple(v) if v is not None else None
+            default_purchase, default_cancel = default_sequences()
+            self.purchase_sequence = preset_data.get('purchase_sequence', default_purchase)
+            self.cancel_sequence = preset_data.get('cancel_sequence', default_cancel)
                 
             self.kp_var.set(preset_data.get('kp', 0.1))
             self.kd_var.set(preset_data.get('kd', 0.5))
+            self.derivative_filter_var.set(preset_data.get('derivative_filter', 0.0))
+            self.hysteresis_var.set(preset_data.get('hysteresis', 0.0))
+            self.predictive_var.set(preset_data.get('predictive_tracking', False))
+            self.pwm_var.set(preset_data.get('pwm_enabled', False))
+            self.pwm_frequency_var.set(preset_data.get('pwm_frequency', 30.0))
+            self.pwm_full_scale_var.set(preset_data.get('pwm_full_scale', 0.1))
+            self.blue_tolerance_var.set(preset_data.get('blue_tolerance', 0))
+            self.dark_tolerance_var.set(preset_data.get('dark_tolerance', 0))
+            self.white_tolerance_var.set(preset_data.get('white_tolerance', 0))
             self.timeout_var.set(preset_data.get('scan_timeout', 15.0))
             self.wait_var.set(preset_data.get('wait_after_loss', 1.0))
+            self.tracking_fps_var.set(preset_data.get('tracking_fps', 60.0))
+            self.idle_fps_var.set(preset_data.get('idle_fps', 10.0))
+            self.pipelined_var.set(preset_data.get('pipelined', False))
             self.hotkeys = preset_data.get('hotkeys', {'toggle_loop': 'f1', 'toggle_overlay': 'f2', 'exit': 'f3'})
             self.overlay_area = preset_data.get('overlay_area', self.overlay_area)
             self.dark_theme = preset_data.get('dark_theme', True)
@@ -1388,6 +1297,9 @@ class HotkeyGUI:
     def setup_system_tray(self):
         """Setup system tray functionality"""
         try:
+            pystray = lazy_import('pystray')
+            Image = lazy_import('PIL.Image')
+            ImageDraw = lazy_import('PIL.ImageDraw')
             # Create a simple icon
             image = Image.new('RGB', (64, 64), color='blue')
             draw = ImageDraw.Draw(image)
@@ -1402,7 +1314,7 @@ class HotkeyGUI:
             
             self.tray_icon = pystray.Icon("GPO Autofish", image, menu=menu)
         except Exception as e:
-            print(f"Error setting up system tray: {e}")
+            log.error('Error setting up system tray: %s', e)
 
     def minimize_to_tray(self):
         """Minimize the application to system tray"""
@@ -1417,10 +1329,41 @@ class HotkeyGUI:
         if self.tray_icon:
             self.tray_icon.stop()
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='GPO Autofish')
+    parser.add_argument('--no-gui', action='store_true', help='run the fishing loop from --preset without the window')
+    parser.add_argument('--preset', help='preset file or name in presets/ to run with --no-gui')
+    parser.add_argument('--startup-report', action='store_true', help='log import and startup times once ready')
+    args = parser.parse_args(argv)
+    if args.no_gui and not args.preset:
+        parser.error('--no-gui needs --preset')
+    if args.no_gui:
+        headless = lazy_import('headless')
+        STARTUP.mark('engine imported')
+        try:
+            preset = headless.resolve_preset(args.preset)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+    setup_logging()
+    if args.no_gui:
+
+        def started(engine):
+            STARTUP.mark('ready')
+            if args.startup_report:
+                log.info('%s', STARTUP.report())
+        try:
+            headless.run(preset, stop=headless.install_signal_handlers(), on_started=started)
+        finally:
+            shutdown_logging()
+        return
+    if tk is None:
+        sys.exit('tkinter is not available; run with --no-gui --preset <file> or python headless.py <preset>')
     root = tk.Tk()
     app = HotkeyGUI(root)
     root.protocol('WM_DELETE_WINDOW', app.exit_app)
+    if args.startup_report:
+        # Queued after finish_startup, so the report includes it
+        root.after_idle(lambda: log.info('%s', STARTUP.report()))
     root.mainloop()
 if __name__ == '__main__':
     main()